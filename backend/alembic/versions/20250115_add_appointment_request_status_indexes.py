@@ -0,0 +1,35 @@
+"""add composite (user, status) indexes to appointment_requests
+
+Revision ID: 20250115_appt_req_status_idx
+Revises: 20250101_add_reschedule_count
+Create Date: 2025-01-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20250115_appt_req_status_idx"
+down_revision: Union[str, None] = "20250101_add_reschedule_count"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_req_doctor_status",
+        "appointment_requests",
+        ["doctor_user_id", "status"],
+    )
+    op.create_index(
+        "ix_req_patient_status",
+        "appointment_requests",
+        ["patient_user_id", "status"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_req_patient_status", table_name="appointment_requests")
+    op.drop_index("ix_req_doctor_status", table_name="appointment_requests")
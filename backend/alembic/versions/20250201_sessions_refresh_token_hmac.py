@@ -0,0 +1,36 @@
+"""make sessions.refresh_token_hash a unique HMAC lookup key
+
+Deploy note: upgrade() deletes every row in sessions, so all users are logged out
+and must sign in again once this migration runs. Their refresh tokens were stored
+as salted bcrypt hashes, which the new HMAC equality lookup can never match.
+
+Revision ID: 20250201_sessions_token_hmac
+Revises: 20250115_appt_req_status_idx
+Create Date: 2025-02-01 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20250201_sessions_token_hmac"
+down_revision: Union[str, None] = "20250115_appt_req_status_idx"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows hold salted bcrypt hashes, which can never match an HMAC lookup;
+    # drop them, which logs every user out (see the deploy note above)
+    op.execute("DELETE FROM sessions")
+    op.create_unique_constraint(
+        "sessions_refresh_token_hash_key",
+        "sessions",
+        ["refresh_token_hash"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("sessions_refresh_token_hash_key", "sessions", type_="unique")
@@ -0,0 +1,41 @@
+"""store sessions.expires_at as timestamptz
+
+Revision ID: 20250215_sessions_expires_tz
+Revises: 20250201_sessions_token_hmac
+Create Date: 2025-02-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20250215_sessions_expires_tz"
+down_revision: Union[str, None] = "20250201_sessions_token_hmac"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing values were written as naive UTC
+    op.alter_column(
+        "sessions",
+        "expires_at",
+        type_=sa.DateTime(timezone=True),
+        existing_type=sa.DateTime(),
+        existing_nullable=False,
+        postgresql_using="expires_at AT TIME ZONE 'UTC'",
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "sessions",
+        "expires_at",
+        type_=sa.DateTime(),
+        existing_type=sa.DateTime(timezone=True),
+        existing_nullable=False,
+        postgresql_using="expires_at AT TIME ZONE 'UTC'",
+    )
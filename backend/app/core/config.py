@@ -38,6 +38,22 @@ class config(BaseSettings):
     DB_NAME: str = os.getenv("DB_NAME", "")
     # Set to true if using Private IP (requires VPC access)
     USE_PRIVATE_IP: bool = os.getenv("USE_PRIVATE_IP", "false").lower() == "true"
+    # Per-connection cache of prepared statements kept by the asyncpg dialect
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = int(
+        os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "500")
+    )
+    # Optional Cloud SQL read replica (PROJECT:REGION:INSTANCE) for read-only endpoints;
+    # when unset, read-only sessions use the primary instance
+    READ_REPLICA_INSTANCE_CONNECTION_NAME: str = os.getenv(
+        "READ_REPLICA_INSTANCE_CONNECTION_NAME", ""
+    )
+    # SQLAlchemy connection pool sizing (per worker process)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "5"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    # Connections opened at startup so early requests skip the connect handshake
+    DB_POOL_WARM_SIZE: int = int(os.getenv("DB_POOL_WARM_SIZE", os.getenv("DB_POOL_SIZE", "20")))
 
     # GCP Cloud Storage Configuration
     GCP_BUCKET_NAME: str = os.getenv("GCP_BUCKET_NAME", "")
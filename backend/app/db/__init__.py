@@ -5,7 +5,7 @@ sys.modules.setdefault("app.db", sys.modules[__name__])
 sys.modules.setdefault("db", sys.modules[__name__])
 
 from .base import Base
-from .database import engine, sessionLocal, init_db, get_session
+from .database import engine, sessionLocal, init_db, get_session, get_readonly_session
 from .models import (
     User,
     DBSession,
@@ -37,6 +37,7 @@ __all__ = [
     "user_model",
     "auth_crud",
     "get_session",
+    "get_readonly_session",
     "User",
     "DBSession",
     "OTPStore",
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Union
 
-from sqlalchemy import or_, select
+from sqlalchemy import or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models.appointment_model import Appointment
 
+# Pass as update_appointment(reschedule_count=INCREMENT) to bump the counter in SQL
+INCREMENT = object()
+
 
 async def list_appointments(
     session: AsyncSession,
@@ -63,7 +66,6 @@ async def create_appointment(
     )
     session.add(appointment)
     await session.commit()
-    await session.refresh(appointment)
     return appointment
 
 
@@ -84,23 +86,39 @@ async def update_appointment(
     duration_minutes: Optional[int] = None,
     status: Optional[str] = None,
     notes: Optional[str] = None,
-    reschedule_count: Optional[int] = None,
+    reschedule_count: Union[int, object, None] = None,
+    max_reschedule_count: Optional[int] = None,
 ) -> Optional[Appointment]:
-    appointment = await get_appointment_by_id(session, appointment_id)
-    if not appointment:
-        return None
-
-    if appointment_date is not None:
-        appointment.appointment_date = appointment_date
-    if duration_minutes is not None:
-        appointment.duration_minutes = duration_minutes
-    if status is not None:
-        appointment.status = status
-    if notes is not None:
-        appointment.notes = notes
-    if reschedule_count is not None:
-        appointment.reschedule_count = reschedule_count
-
+    """
+    Update an appointment with a single UPDATE ... RETURNING.
+
+    reschedule_count=INCREMENT renders `reschedule_count = reschedule_count + 1`, and
+    max_reschedule_count only lets the update through while the stored count is below
+    it. Returns None when no row matched (missing appointment or limit reached).
+    """
+    values = {
+        "appointment_date": appointment_date,
+        "duration_minutes": duration_minutes,
+        "status": status,
+        "notes": notes,
+    }
+    values = {key: value for key, value in values.items() if value is not None}
+    if reschedule_count is INCREMENT:
+        values["reschedule_count"] = Appointment.reschedule_count + 1
+    elif reschedule_count is not None:
+        values["reschedule_count"] = reschedule_count
+    if not values:
+        return await get_appointment_by_id(session, appointment_id)
+
+    stmt = update(Appointment).where(Appointment.appointment_id == appointment_id)
+    if max_reschedule_count is not None:
+        stmt = stmt.where(Appointment.reschedule_count < max_reschedule_count)
+    stmt = (
+        stmt.values(**values)
+        .returning(Appointment)
+        .execution_options(populate_existing=True, synchronize_session=False)
+    )
+    result = await session.execute(stmt)
+    appointment = result.scalar_one_or_none()
     await session.commit()
-    await session.refresh(appointment)
-    return appointment
\ No newline at end of file
+    return appointment
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
 from datetime import datetime, time
-from typing import Iterable, Optional
+from typing import Optional, Sequence
 
-from sqlalchemy import select, or_, and_
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
+from db.models.appointment_model import Appointment
 from db.models.appointment_request_model import AppointmentRequest, AppointmentRequestStatus
 from db.models.user_model import User
+from schemas.appointment_request_schema import AppointmentRequestRead
+
+# List endpoints only need the columns AppointmentRequestRead exposes; selecting them
+# directly returns lightweight Rows instead of identity-mapped ORM instances.
+_READ_COLUMNS = tuple(
+    getattr(AppointmentRequest, name) for name in AppointmentRequestRead.model_fields
+)
 
 
 async def create_appointment_request(
@@ -36,15 +45,42 @@ async def create_appointment_request(
     )
     session.add(request)
     await session.commit()
-    await session.refresh(request)
     return request
 
 
 async def get_appointment_request_by_id(
     session: AsyncSession,
     request_id: int,
+    *,
+    accessible_by_user_id: Optional[int] = None,
 ) -> Optional[AppointmentRequest]:
+    """When accessible_by_user_id is given, only return the request if that user is its patient or doctor."""
     stmt = select(AppointmentRequest).where(AppointmentRequest.request_id == request_id)
+    if accessible_by_user_id is not None:
+        stmt = stmt.where(
+            or_(
+                AppointmentRequest.patient_user_id == accessible_by_user_id,
+                AppointmentRequest.doctor_user_id == accessible_by_user_id,
+            )
+        )
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def get_appointment_request_with_parties(
+    session: AsyncSession,
+    request_id: int,
+) -> Optional[AppointmentRequest]:
+    """Load a request together with its doctor, patient and appointment in one JOINed query."""
+    stmt = (
+        select(AppointmentRequest)
+        .options(
+            joinedload(AppointmentRequest.doctor),
+            joinedload(AppointmentRequest.patient),
+            joinedload(AppointmentRequest.appointment),
+        )
+        .where(AppointmentRequest.request_id == request_id)
+    )
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
 
@@ -53,30 +89,30 @@ async def list_appointment_requests_for_patient(
     session: AsyncSession,
     patient_user_id: int,
     status: Optional[str] = None,
-) -> Iterable[AppointmentRequest]:
-    stmt = select(AppointmentRequest).where(
+) -> Sequence[Row]:
+    stmt = select(*_READ_COLUMNS).where(
         AppointmentRequest.patient_user_id == patient_user_id
     )
     if status:
         stmt = stmt.where(AppointmentRequest.status == status)
     stmt = stmt.order_by(AppointmentRequest.created_at.desc())
     result = await session.execute(stmt)
-    return result.scalars().all()
+    return result.all()
 
 
 async def list_appointment_requests_for_doctor(
     session: AsyncSession,
     doctor_user_id: int,
     status: Optional[str] = None,
-) -> Iterable[AppointmentRequest]:
-    stmt = select(AppointmentRequest).where(
+) -> Sequence[Row]:
+    stmt = select(*_READ_COLUMNS).where(
         AppointmentRequest.doctor_user_id == doctor_user_id
     )
     if status:
         stmt = stmt.where(AppointmentRequest.status == status)
     stmt = stmt.order_by(AppointmentRequest.created_at.desc())
     result = await session.execute(stmt)
-    return result.scalars().all()
+    return result.all()
 
 
 async def update_appointment_request(
@@ -91,27 +127,94 @@ async def update_appointment_request(
     notes: Optional[str] = None,
     appointment_id: Optional[int] = None,
 ) -> Optional[AppointmentRequest]:
-    request = await get_appointment_request_by_id(session, request_id)
-    if not request:
-        return None
+    values = {
+        "status": status,
+        "preferred_date": preferred_date,
+        "preferred_time_slot_start": preferred_time_slot_start,
+        "suggested_date": suggested_date,
+        "suggested_time_slot_start": suggested_time_slot_start,
+        "notes": notes,
+        "appointment_id": appointment_id,
+    }
+    values = {key: value for key, value in values.items() if value is not None}
+    if not values:
+        return await get_appointment_request_by_id(session, request_id)
+
+    # UPDATE ... RETURNING hands back the updated row, so no follow-up SELECT is needed
+    stmt = (
+        update(AppointmentRequest)
+        .where(AppointmentRequest.request_id == request_id)
+        .values(**values)
+        .returning(AppointmentRequest)
+        .execution_options(populate_existing=True)
+    )
+    result = await session.execute(stmt)
+    request = result.scalar_one_or_none()
+    await session.commit()
+    return request
 
-    if status is not None:
-        request.status = status
-    if preferred_date is not None:
-        request.preferred_date = preferred_date
-    if preferred_time_slot_start is not None:
-        request.preferred_time_slot_start = preferred_time_slot_start
-    if suggested_date is not None:
-        request.suggested_date = suggested_date
-    if suggested_time_slot_start is not None:
-        request.suggested_time_slot_start = suggested_time_slot_start
-    if notes is not None:
-        request.notes = notes
-    if appointment_id is not None:
-        request.appointment_id = appointment_id
 
+async def atomic_accept_reschedule(
+    session: AsyncSession,
+    request_id: int,
+    appointment_id: int,
+    combined_datetime: datetime,
+    *,
+    time_slot_start: time,
+    appointment_notes: Optional[str] = None,
+    request_notes: Optional[str] = None,
+    max_reschedule_count: Optional[int] = None,
+) -> Optional[AppointmentRequest]:
+    """
+    Move the appointment to the accepted slot, bump its reschedule_count and confirm
+    the request in one statement (data-modifying CTE). With max_reschedule_count the
+    appointment only moves while its stored count is below it. Returns None when
+    either row is missing or the limit is reached, in which case nothing is changed.
+    """
+    appointment_values = {
+        "appointment_date": combined_datetime,
+        "status": "scheduled",
+        "reschedule_count": Appointment.reschedule_count + 1,
+    }
+    if appointment_notes is not None:
+        appointment_values["notes"] = appointment_notes
+    appointment_update = update(Appointment).where(
+        Appointment.appointment_id == appointment_id
+    )
+    if max_reschedule_count is not None:
+        appointment_update = appointment_update.where(
+            Appointment.reschedule_count < max_reschedule_count
+        )
+    updated_appt = (
+        appointment_update
+        .values(**appointment_values)
+        .returning(Appointment.appointment_id)
+        .cte("updated_appt")
+    )
+
+    request_values = {
+        "status": AppointmentRequestStatus.confirmed.value,
+        "preferred_date": combined_datetime,
+        "preferred_time_slot_start": time_slot_start,
+    }
+    if request_notes is not None:
+        request_values["notes"] = request_notes
+    stmt = (
+        update(AppointmentRequest)
+        .where(
+            AppointmentRequest.request_id == request_id,
+            AppointmentRequest.appointment_id == updated_appt.c.appointment_id,
+        )
+        .values(**request_values)
+        .returning(AppointmentRequest)
+        .execution_options(populate_existing=True, synchronize_session=False)
+    )
+    result = await session.execute(stmt)
+    request = result.scalar_one_or_none()
+    if request is None:
+        await session.rollback()
+        return None
     await session.commit()
-    await session.refresh(request)
     return request
 
 
@@ -119,7 +222,7 @@ async def get_appointment_requests_with_users(
     session: AsyncSession,
     user_id: int,
     is_patient: bool = True,
-) -> Iterable[AppointmentRequest]:
+) -> Sequence[AppointmentRequest]:
     if is_patient:
         stmt = select(AppointmentRequest).where(
             AppointmentRequest.patient_user_id == user_id
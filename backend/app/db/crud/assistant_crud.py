@@ -1,7 +1,8 @@
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, true
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from db import ChatHistory
+from sqlalchemy.orm import aliased, defer
+from db import ChatHistory, User
 
 
 # here role is belongs to model not medilink
@@ -35,6 +36,33 @@ async def get_recent_messages(session: AsyncSession, user_id: int, limit: int =
     return list(reversed(rows))
 
 
+# get the user and their last n messages in one round trip (None, [] if no user)
+async def get_user_with_recent_messages(
+    session: AsyncSession, user_id: int, limit: int = 20
+):
+    recent = (
+        select(ChatHistory)
+        .where(ChatHistory.user_id == User.id)
+        .order_by(ChatHistory.timestamp.desc())
+        .limit(limit)
+        .lateral("recent")
+    )
+    message = aliased(ChatHistory, recent)
+    stmt = (
+        select(User, message)
+        .outerjoin(recent, true())
+        .options(defer(User.password_hash))
+        .where(User.id == user_id)
+        .order_by(message.timestamp.desc())
+    )
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return None, []
+    # reverse to oldest → newest order; a user without history yields one NULL row
+    messages = [m for _, m in reversed(rows) if m is not None]
+    return rows[0][0], messages
+
+
 # clear chat history of user
 async def clear_chat_history(session: AsyncSession, user_id: int):
     query = delete(ChatHistory).where(ChatHistory.user_id == user_id)
@@ -1,5 +1,7 @@
-from sqlalchemy import select
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 from db import User, DBSession, OTPStore
 from datetime import datetime, timezone
 
@@ -16,18 +18,39 @@ async def check_user_exists(email: str, phone: str, session: AsyncSession):
 
 async def check_user_by_email(email: str, session: AsyncSession):
     """Check if a user with the given email exists"""
-    existing_user = await session.scalar(
-        select(User).where(User.email == email)
-    )
+    existing_user = await session.scalar(select(User).where(User.email == email))
+    # End the read transaction so its pooled connection isn't held idle while the
+    # caller runs the password KDF (expire_on_commit=False keeps the user loaded)
+    await session.commit()
     return existing_user
 
 
-async def create_user(user_data_dict, hashed, session: AsyncSession):
-    db_user = User(**user_data_dict, password_hash=hashed)
-    session.add(db_user)
+async def get_user_by_email_for_update(email: str, session: AsyncSession):
+    """Fetch a user by email and row-lock it until the caller commits or rolls back.
 
+    Serialises concurrent signups that try to add a role to the same account.
+    """
+    return await session.scalar(
+        select(User)
+        .where(User.email == email)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+async def create_user_if_absent(user_data_dict, hashed, session: AsyncSession):
+    """Insert a user unless the email is taken; returns the new user or None.
+
+    INSERT ... ON CONFLICT (email) DO NOTHING RETURNING: the database arbitrates the
+    email race and server defaults come back in the same round trip.
+    """
+    db_user = await session.scalar(
+        pg_insert(User)
+        .values(**user_data_dict, password_hash=hashed)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
     await session.commit()
-    await session.refresh(db_user)
     return db_user
 
 
@@ -37,21 +60,30 @@ async def login_user(user, session: AsyncSession):
             (User.email == user.email_or_phone) | (User.phone == user.email_or_phone)
         )
     )
+    # End the read transaction so its pooled connection isn't held idle while the
+    # caller runs the password KDF (expire_on_commit=False keeps the user loaded)
+    await session.commit()
     return validate_user
 
 
 async def create_session(
     user_id: int, refresh_token_hash, refresh_exp, session: AsyncSession
 ):
-    naive_refresh_exp = refresh_exp.replace(tzinfo=None)
+    # Prune this user's expired sessions in the same transaction so repeated logins
+    # don't grow the table without bound (served by the user_id index)
+    await session.execute(
+        delete(DBSession).where(
+            (DBSession.user_id == user_id) & (DBSession.expires_at < func.now())
+        )
+    )
     user_session = DBSession(
         user_id=user_id,
         refresh_token_hash=refresh_token_hash,
-        expires_at=naive_refresh_exp,
+        expires_at=refresh_exp,
     )
     session.add(user_session)
+    # No refresh afterwards: callers never read the row back
     await session.commit()
-    await session.refresh(user_session)
 
 
 async def store_otp(
@@ -66,39 +98,36 @@ async def store_otp(
 
 
 # ------------------------------------------------
-async def verify_otp(
+async def verify_otp_and_fetch_user(
     user_id: int,
     identifier: str,
     otp_code: str,
     session: AsyncSession,
 ):
-    otp_record = await session.scalar(
-        select(OTPStore).where(
+    """Consume a matching OTP and return its user if the OTP had not expired.
+
+    One statement: the OTP row is deleted (valid or expired, as before) in a CTE and
+    the user is joined onto it, so there is no separate SELECT/DELETE/user lookup.
+    """
+    naive_utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+    consumed = (
+        delete(OTPStore)
+        .where(
             (OTPStore.user_id == user_id)
             & (OTPStore.identifier == identifier)
             & (OTPStore.otp_code == otp_code)
         )
+        .returning(OTPStore.user_id, OTPStore.expires_at)
+        .cte("consumed")
     )
-    naive_utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
-
-    if otp_record and otp_record.expires_at > naive_utc_now:
-        # Successful verification: delete the record and return the object
-
-        # 3. Delete record immediately upon successful verification
-        try:
-            await session.delete(otp_record)
-            await session.commit()
-            return otp_record
-        except Exception:
-            # Handle case where commit fails but verification was valid
-            return otp_record
-
-    # If invalid or expired, delete and return None
-    if otp_record:
-        await session.delete(otp_record)
-        await session.commit()
-
-    return None
+    user = await session.scalar(
+        select(User)
+        .join(consumed, User.id == consumed.c.user_id)
+        .where(consumed.c.expires_at > naive_utc_now)
+        .limit(1)
+    )
+    await session.commit()
+    return user
 
 
 async def current_user(email: str, session: AsyncSession):
@@ -107,40 +136,52 @@ async def current_user(email: str, session: AsyncSession):
 
 
 async def get_user_by_id(user_id: int, session: AsyncSession):
-    user = await session.scalar(select(User).where(User.id == user_id))
+    # Identity/profile lookups never need the password hash; leave it out of the row
+    user = await session.scalar(
+        select(User).options(defer(User.password_hash)).where(User.id == user_id)
+    )
     return user
 
 
 async def update_user_patient_status(user_id: int, is_patient: bool, session: AsyncSession):
-    """Update user's is_patient status"""
-    user = await session.scalar(select(User).where(User.id == user_id))
-    if user:
-        user.is_patient = is_patient
-        await session.commit()
-        await session.refresh(user)
-        return user
-    return None
-
-
-async def active_sessions(hashed_incoming_token, session: AsyncSession):
-    sessions = await session.execute(
-        select(DBSession).where(DBSession.refresh_token_hash == hashed_incoming_token)
+    """Update user's is_patient status; returns the updated user or None.
+
+    One UPDATE ... RETURNING instead of SELECT, UPDATE and a refresh SELECT.
+    """
+    user = await session.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_patient=is_patient, updated_at=func.now())
+        .returning(User),
+        execution_options={"populate_existing": True},
     )
+    await session.commit()
+    return user
 
-    return sessions.all()
+
+async def update_password_hash(user_id: int, password_hash: str, session: AsyncSession):
+    """Replace a user's stored password hash, e.g. when upgrading the hash scheme"""
+    await session.execute(
+        update(User).where(User.id == user_id).values(password_hash=password_hash)
+    )
+    await session.commit()
 
 
-async def get_all_active_sessions(session: AsyncSession):
-    """Get all active (non-expired) sessions for refresh token verification.
+async def active_session_with_user(hashed_incoming_token, session: AsyncSession):
+    """Return (session, user) for a matching refresh_token_hash, or None.
 
-    bcrypt produces different hashes each time, so we need to fetch all sessions
-    and verify the refresh token against each stored hash.
+    The user is outer-joined in the same SELECT (user is None if it was deleted), so
+    a refresh costs one round trip instead of a session lookup plus a user lookup.
     """
-    naive_utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
-    result = await session.execute(
-        select(DBSession).where(DBSession.expires_at > naive_utc_now)
-    )
-    return result.scalars().all()
+    row = (
+        await session.execute(
+            select(DBSession, User)
+            .outerjoin(User, User.id == DBSession.user_id)
+            .options(defer(User.password_hash))
+            .where(DBSession.refresh_token_hash == hashed_incoming_token)
+        )
+    ).first()
+    return tuple(row) if row else None
 
 
 async def delete_session(db_session: DBSession, session: AsyncSession):
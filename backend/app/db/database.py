@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from db import Base
 from db.models import (
     User,
@@ -44,7 +44,7 @@ async def init_connector():
         connector = Connector(loop=connector_loop)
 
 
-async def getconn() -> asyncpg.Connection:
+async def getconn(instance_connection_name: str = None) -> asyncpg.Connection:
     """
     Create a connection to Cloud SQL using Cloud SQL Python Connector.
     This function is called by SQLAlchemy when creating a new connection.
@@ -63,26 +63,67 @@ async def getconn() -> asyncpg.Connection:
         connector_loop = current_loop
 
     conn: asyncpg.Connection = await connector.connect_async(
-        config.INSTANCE_CONNECTION_NAME,
+        instance_connection_name or config.INSTANCE_CONNECTION_NAME,
         "asyncpg",
         user=config.DB_USER,
         password=config.DB_PASSWORD,
         db=config.DB_NAME,
         ip_type="private" if config.USE_PRIVATE_IP else "public",
+        # Short OLTP queries never benefit from JIT compilation
+        server_settings={"jit": "off"},
     )
     return conn
 
 
+def _creator(instance_connection_name: str = None):
+    """
+    Wrap getconn() the same way async_creator does, but also pass the
+    prepared statement cache size (async_creator offers no way to set it).
+    """
+    return engine.sync_engine.dialect.dbapi.connect(
+        async_creator_fn=lambda: getconn(instance_connection_name),
+        prepared_statement_cache_size=config.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    )
+
+
+def _pool_options():
+    # The connector only brokers new connections; keep a warm pool so requests
+    # don't pay the TLS + auth handshake to Cloud SQL on every checkout.
+    return dict(
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
 # Create engine using Cloud SQL Connector
 engine = create_async_engine(
     "postgresql+asyncpg://",
-    async_creator=getconn,
-    poolclass=NullPool,  # Cloud SQL Connector handles connection pooling
+    creator=_creator,
     echo=True,
+    **_pool_options(),
 )
 
 sessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Read-only traffic (list endpoints) goes to the replica when one is configured
+if config.READ_REPLICA_INSTANCE_CONNECTION_NAME:
+    readonly_engine = create_async_engine(
+        "postgresql+asyncpg://",
+        creator=lambda: _creator(config.READ_REPLICA_INSTANCE_CONNECTION_NAME),
+        echo=True,
+        **_pool_options(),
+    )
+    readonlySessionLocal = async_sessionmaker(
+        readonly_engine, class_=AsyncSession, expire_on_commit=False
+    )
+else:
+    readonly_engine = engine
+    readonlySessionLocal = sessionLocal
+
 
 # Dependency (to be used in routes for getting DB session)
 async def get_session() -> AsyncSession:
@@ -90,6 +131,27 @@ async def get_session() -> AsyncSession:
         yield session
 
 
+# Dependency for read-only routes; may lag the primary by replication delay
+async def get_readonly_session() -> AsyncSession:
+    async with readonlySessionLocal() as session:
+        yield session
+
+
+async def warm_pool(size: int = None):
+    """
+    Open and release `size` connections on each engine at startup, so the first
+    requests find them in the pool instead of paying the Cloud SQL handshake.
+    """
+    size = config.DB_POOL_WARM_SIZE if size is None else size
+    # anything beyond pool_size would be overflow, which is discarded on release
+    size = min(size, config.DB_POOL_SIZE)
+    engines = {id(e): e for e in (engine, readonly_engine)}.values()
+    for eng in engines:
+        conns = await asyncio.gather(*(eng.connect() for _ in range(size)))
+        for conn in conns:
+            await conn.close()
+
+
 # need to shift to main.py later
 async def init_db():
     async with engine.begin() as conn:
@@ -35,3 +35,5 @@ class Appointment(Base):
         onupdate=func.now(),
     )
 
+    # Fetch server-generated timestamps with INSERT/UPDATE ... RETURNING instead of a refresh SELECT
+    __mapper_args__ = {"eager_defaults": True}
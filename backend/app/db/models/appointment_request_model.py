@@ -4,7 +4,7 @@ from datetime import datetime, time
 from typing import Optional
 import enum
 
-from sqlalchemy import DateTime, Integer, String, Text, Boolean, Time, ForeignKey, func, Enum as SQLEnum
+from sqlalchemy import DateTime, Integer, String, Text, Boolean, Time, ForeignKey, Index, func, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.base import Base
@@ -21,6 +21,13 @@ class AppointmentRequestStatus(str, enum.Enum):
     confirmed = "confirmed"
 
 
+def _combine_slot(day: Optional[datetime], slot: Optional[time]) -> Optional[datetime]:
+    if day is None or slot is None:
+        return None
+    # date() keeps the wall-clock day of `day`, so re-attaching its tzinfo is lossless
+    return datetime.combine(day.date(), slot, tzinfo=day.tzinfo)
+
+
 class AppointmentRequest(Base):
     __tablename__ = "appointment_requests"
 
@@ -53,3 +60,28 @@ class AppointmentRequest(Base):
         onupdate=func.now(),
     )
 
+    # lazy="raise": these must be eager-loaded by the query that needs them, so an
+    # accidental per-row lazy load (N+1, or an implicit IO error under asyncio) fails loudly
+    doctor: Mapped["User"] = relationship(foreign_keys=[doctor_user_id], lazy="raise")
+    patient: Mapped["User"] = relationship(foreign_keys=[patient_user_id], lazy="raise")
+    appointment: Mapped[Optional["Appointment"]] = relationship(lazy="raise")
+
+    @property
+    def preferred_datetime(self) -> Optional[datetime]:
+        """The preferred day at preferred_time_slot_start, in preferred_date's timezone."""
+        return _combine_slot(self.preferred_date, self.preferred_time_slot_start)
+
+    @property
+    def suggested_datetime(self) -> Optional[datetime]:
+        """The suggested day at suggested_time_slot_start, in suggested_date's timezone."""
+        return _combine_slot(self.suggested_date, self.suggested_time_slot_start)
+
+    # Server defaults (created_at/updated_at) come back through INSERT ... RETURNING,
+    # so callers don't need a refresh SELECT after flushing a new request
+    __mapper_args__ = {"eager_defaults": True}
+
+    # Composite indexes backing the per-user list endpoints, which filter on (user, status)
+    __table_args__ = (
+        Index("ix_req_doctor_status", "doctor_user_id", "status"),
+        Index("ix_req_patient_status", "patient_user_id", "status"),
+    )
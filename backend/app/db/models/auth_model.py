@@ -12,9 +12,11 @@ class DBSession(Base):
     # the user_id is connected to particular users user_id column (mapped as id in User model)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), index=True)
 
-    # Stores the HASHED refresh token
-    refresh_token_hash: Mapped[str] = mapped_column(String, nullable=False)
-    expires_at: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
+    # Stores the HMAC-SHA256 of the refresh token (see services.auth_utils.hash_refresh_token)
+    refresh_token_hash: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
 
     # Relationship to the User model
     user: Mapped["User"] = relationship(back_populates="sessions")
@@ -60,6 +60,18 @@ class User(Base):
         DateTime(timezone=True), nullable=True, server_default=func.now()
     )
 
+    @property
+    def role_str(self) -> Optional[str]:
+        """Role as a plain string ('doctor', ...) whether loaded as an Enum or str.
+
+        A plain property rather than a cached one: signup reassigns `role` on a
+        loaded instance, and a memoized value would go stale.
+        """
+        role = self.role
+        if role is None:
+            return None
+        return role.value if hasattr(role, "value") else str(role)
+
     # Link to dbsessions
     sessions: Mapped[List["DBSession"]] = relationship(back_populates="user")
     # Link to the OTPStore
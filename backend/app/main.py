@@ -6,9 +6,10 @@ from typing import List
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from db import init_db
-from db.database import init_connector, close_connector
+from db.database import init_connector, close_connector, warm_pool
 from routers import (
     auth_routes,
     doctor_routes,
@@ -26,7 +27,11 @@ from routers import (
 from services.redis_service import get_redis_client, close_redis_client
 
 
-app = FastAPI(title="Healthcare Appointment System API", version="1.0.0")
+app = FastAPI(
+    title="Healthcare Appointment System API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 DEFAULT_CORS_ORIGINS = [
     "http://localhost",
@@ -85,6 +90,11 @@ async def on_startup():
     await init_connector()
     # Then initialize the database
     await init_db()
+    # Pre-open pooled connections (best effort)
+    try:
+        await warm_pool()
+    except Exception as e:
+        print(f"Warning: DB pool warm-up failed: {e}")
     # Initialize Redis connection
     try:
         await get_redis_client()
@@ -5,17 +5,20 @@ from fastapi import (
     status,
     Cookie,
     Query,
+    Response,
 )
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from datetime import datetime, time
+from typing import List, NamedTuple, Optional
+import logging
 
-from db import get_session
+from db import get_session, get_readonly_session
 from db.crud import (
-    auth_crud,
     appointment_request_crud,
     notification_crud,
     appointment_crud,
+    auth_crud,
 )
 from schemas import (
     AppointmentRequestCreate,
@@ -24,18 +27,21 @@ from schemas import (
     AppointmentRequestResponse,
 )
 from services import verify_access_token
+from services.redis_service import get_cache, set_cache, delete_cache
 from db.models.appointment_request_model import AppointmentRequestStatus
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(default_response_class=ORJSONResponse)
 
+MAX_RESCHEDULE_COUNT = 2
 
-def get_role_value(role) -> Optional[str]:
-    """Extract role value from Enum or string"""
-    if role is None:
-        return None
-    if hasattr(role, 'value'):
-        return role.value
-    return str(role)
+# List responses are polled by the UI; cache them briefly and drop them on every write
+REQUEST_LIST_CACHE_TTL = 5
+_CACHEABLE_STATUS_FILTERS = (None, *(item.value for item in AppointmentRequestStatus))
+
+_request_adapter = TypeAdapter(AppointmentRequestRead)
+_request_list_adapter = TypeAdapter(List[AppointmentRequestRead])
 
 
 async def get_authenticated_user(
@@ -59,6 +65,56 @@ async def get_authenticated_user(
     return user
 
 
+def _fmt_date(value) -> str:
+    """YYYY-MM-DD via integer formatting; cheaper than strftime on the PATCH hot path."""
+    return f"{value.year:04d}-{value.month:02d}-{value.day:02d}"
+
+
+def _fmt_time(value) -> str:
+    """HH:MM counterpart of _fmt_date."""
+    return f"{value.hour:02d}:{value.minute:02d}"
+
+
+def _render(adapter: TypeAdapter, data, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    Validate ORM data against the read schema once and serialize it in pydantic-core.
+    Returning a Response skips FastAPI's second response_model validation pass;
+    response_model stays on the routes for the OpenAPI schema.
+    """
+    validated = adapter.validate_python(data, from_attributes=True)
+    return Response(
+        content=adapter.dump_json(validated),
+        media_type="application/json",
+        status_code=status_code,
+    )
+
+
+def _list_cache_key(audience: str, user_id: int, status_filter: Optional[str]) -> str:
+    return f"apptreq:{audience}:{user_id}:{status_filter or 'all'}"
+
+
+async def _cached_list(audience: str, user_id: int, status_filter: Optional[str], load) -> Response:
+    """Serve a list endpoint from Redis, falling back to `load()` on a miss or Redis error."""
+    if status_filter not in _CACHEABLE_STATUS_FILTERS:
+        return _render(_request_list_adapter, await load())
+
+    cache_key = _list_cache_key(audience, user_id, status_filter)
+    cached = await get_cache(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    response = _render(_request_list_adapter, await load())
+    await set_cache(cache_key, response.body.decode(), ttl=REQUEST_LIST_CACHE_TTL)
+    return response
+
+
+async def _invalidate_request_lists(patient_user_id: int, doctor_user_id: int) -> None:
+    await delete_cache(
+        *(_list_cache_key("patient", patient_user_id, item) for item in _CACHEABLE_STATUS_FILTERS),
+        *(_list_cache_key("doctor", doctor_user_id, item) for item in _CACHEABLE_STATUS_FILTERS),
+    )
+
+
 @router.post("/", response_model=AppointmentRequestRead, status_code=status.HTTP_201_CREATED)
 async def create_appointment_request(
     request_data: AppointmentRequestCreate,
@@ -83,9 +139,6 @@ async def create_appointment_request(
         reason=request_data.reason,
         notes=request_data.notes,
     )
-
-    doctor = await auth_crud.get_user_by_id(request_data.doctor_user_id, session)
-    doctor_name = f"{doctor.first_name} {doctor.last_name}".strip() if doctor else "Doctor"
     patient_name = f"{current_user.first_name} {current_user.last_name}".strip()
 
     await notification_crud.create_notification(
@@ -93,20 +146,21 @@ async def create_appointment_request(
         user_id=request_data.doctor_user_id,
         type="appointment_request",
         title="New Appointment Request",
-        message=f"{patient_name} has requested an appointment for {request_data.preferred_date.strftime('%Y-%m-%d')} at {request_data.preferred_time_slot_start.strftime('%H:%M')}",
+        message=f"{patient_name} has requested an appointment for {_fmt_date(request_data.preferred_date)} at {_fmt_time(request_data.preferred_time_slot_start)}",
         appointment_request_id=request.request_id,
         related_entity_type="appointment_request",
         related_entity_id=request.request_id,
     )
+    await _invalidate_request_lists(current_user.id, request_data.doctor_user_id)
 
-    return request
+    return _render(_request_adapter, request, status.HTTP_201_CREATED)
 
 
 @router.get("/patient", response_model=List[AppointmentRequestRead])
 async def list_patient_appointment_requests(
     status_filter: Optional[str] = Query(None, alias="status"),
     current_user = Depends(get_authenticated_user),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_readonly_session),
 ):
     """List appointment requests for the current patient"""
     if not current_user.is_patient:
@@ -115,35 +169,41 @@ async def list_patient_appointment_requests(
             detail="Only patients can view their appointment requests"
         )
 
-    requests = await appointment_request_crud.list_appointment_requests_for_patient(
-        session,
-        patient_user_id=current_user.id,
-        status=status_filter,
+    return await _cached_list(
+        "patient",
+        current_user.id,
+        status_filter,
+        lambda: appointment_request_crud.list_appointment_requests_for_patient(
+            session,
+            patient_user_id=current_user.id,
+            status=status_filter,
+        ),
     )
-    return list(requests)
 
 
 @router.get("/doctor", response_model=List[AppointmentRequestRead])
 async def list_doctor_appointment_requests(
     status_filter: Optional[str] = Query(None, alias="status"),
     current_user = Depends(get_authenticated_user),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_readonly_session),
 ):
     """List appointment requests for the current doctor"""
-    role_value = get_role_value(current_user.role)
-    
-    if role_value != "doctor":
+    if current_user.role_str != "doctor":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only doctors can view appointment requests"
         )
 
-    requests = await appointment_request_crud.list_appointment_requests_for_doctor(
-        session,
-        doctor_user_id=current_user.id,
-        status=status_filter,
+    return await _cached_list(
+        "doctor",
+        current_user.id,
+        status_filter,
+        lambda: appointment_request_crud.list_appointment_requests_for_doctor(
+            session,
+            doctor_user_id=current_user.id,
+            status=status_filter,
+        ),
     )
-    return list(requests)
 
 
 @router.get("/{request_id}", response_model=AppointmentRequestRead)
@@ -153,9 +213,11 @@ async def get_appointment_request(
     session: AsyncSession = Depends(get_session),
 ):
     """Get a specific appointment request"""
+    # Ownership is part of the WHERE clause, so requests the caller can't see are a 404
     request = await appointment_request_crud.get_appointment_request_by_id(
         session,
         request_id,
+        accessible_by_user_id=current_user.id,
     )
     if not request:
         raise HTTPException(
@@ -163,13 +225,484 @@ async def get_appointment_request(
             detail="Appointment request not found"
         )
 
-    if request.patient_user_id != current_user.id and request.doctor_user_id != current_user.id:
+    return _render(_request_adapter, request)
+
+
+class _PartyNames(NamedTuple):
+    doctor: str
+    patient: str
+
+
+def _require_linked_appointment(request, detail: str = "Appointment not found"):
+    if not request.appointment:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to view this appointment request"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=detail
+        )
+    return request.appointment
+
+
+def _require_preferred_slot(request) -> None:
+    if not request.preferred_date or not request.preferred_time_slot_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Preferred date and time are required to accept an appointment request"
+        )
+
+
+def _require_doctor_suggestion(request, action: str) -> None:
+    if request.status is not AppointmentRequestStatus.doctor_suggested_alternative:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Can only {action} alternative when doctor has suggested one. Current status: {request.status.value}"
+        )
+
+
+def _raise_reschedule_not_applied(request, detail: str = "Appointment not found"):
+    """
+    A reschedule UPDATE guarded by MAX_RESCHEDULE_COUNT matched no row. The request's
+    JOINed appointment tells the cases apart: missing is a 404, otherwise the limit
+    was reached.
+    """
+    _require_linked_appointment(request, detail)
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Maximum reschedule limit ({MAX_RESCHEDULE_COUNT}) has been reached for this appointment"
+    )
+
+
+async def _doctor_accept_reschedule(session, request, update_data, names):
+    # RESCHEDULING: Doctor accepts reschedule request
+    _require_preferred_slot(request)
+    combined_datetime = request.preferred_datetime
+    _require_linked_appointment(request)
+
+    # Move the appointment, increment its reschedule count and confirm
+    # the request in a single statement; the UPDATE also enforces the reschedule limit
+    updated_request = await appointment_request_crud.atomic_accept_reschedule(
+        session,
+        request.request_id,
+        request.appointment_id,
+        combined_datetime,
+        time_slot_start=request.preferred_time_slot_start,
+        appointment_notes=update_data.notes or request.notes,
+        request_notes=update_data.notes,
+        max_reschedule_count=MAX_RESCHEDULE_COUNT,
+    )
+    if not updated_request:
+        _raise_reschedule_not_applied(request)
+    await notification_crud.create_notification(
+        session,
+        user_id=request.patient_user_id,
+        type="appointment_confirmed",
+        title="Appointment Reschedule Confirmed",
+        message=f"{names.doctor} approved your reschedule request for {_fmt_date(combined_datetime)} at {_fmt_time(request.preferred_time_slot_start)}.",
+        appointment_request_id=request.request_id,
+        appointment_id=request.appointment_id,
+        related_entity_type="appointment",
+        related_entity_id=request.appointment_id,
+    )
+    return updated_request
+
+
+async def _doctor_accept_initial(session, request, update_data, names):
+    # INITIAL BOOKING: Doctor accepts initial appointment request
+    _require_preferred_slot(request)
+    combined_datetime = request.preferred_datetime
+
+    appointment = await appointment_crud.create_appointment(
+        session,
+        patient_user_id=request.patient_user_id,
+        doctor_user_id=request.doctor_user_id,
+        clinic_id=request.clinic_id,
+        appointment_date=combined_datetime,
+        duration_minutes=30,
+        status="scheduled",
+        appointment_type="consultation",
+        reason=request.reason,
+        notes=request.notes,
+    )
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="confirmed",
+        appointment_id=appointment.appointment_id,
+        notes=update_data.notes,
+    )
+    if updated_request:
+        await notification_crud.create_notification(
+            session,
+            user_id=request.patient_user_id,
+            type="appointment_accepted",
+            title="Appointment Accepted",
+            message=f"{names.doctor} has accepted your appointment request for {_fmt_date(combined_datetime)} at {_fmt_time(request.preferred_time_slot_start)}.",
+            appointment_request_id=request.request_id,
+            appointment_id=appointment.appointment_id,
+            related_entity_type="appointment",
+            related_entity_id=appointment.appointment_id,
+        )
+    return updated_request
+
+
+async def _doctor_reject_reschedule(session, request, update_data, names):
+    # RESCHEDULING: Doctor rejects reschedule request - appointment stays same
+    appointment = _require_linked_appointment(request)
+    original_datetime = appointment.appointment_date
+    original_time = appointment.appointment_date.time()
+
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="confirmed",
+        preferred_date=original_datetime,
+        preferred_time_slot_start=original_time,
+        suggested_date=None,
+        suggested_time_slot_start=None,
+        notes=update_data.notes,
+    )
+    if updated_request:
+        await notification_crud.create_notification(
+            session,
+            user_id=request.patient_user_id,
+            type="appointment_confirmed",
+            title="Reschedule Request Rejected",
+            message=f"{names.doctor} has rejected your reschedule request. The appointment remains confirmed for its original time.",
+            appointment_request_id=request.request_id,
+            appointment_id=request.appointment_id,
+            related_entity_type="appointment",
+            related_entity_id=request.appointment_id,
         )
+    return updated_request
 
-    return request
+
+async def _doctor_reject_initial(session, request, update_data, names):
+    # INITIAL BOOKING: Doctor rejects initial appointment request
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="rejected",
+        notes=update_data.notes,
+    )
+    if updated_request:
+        await notification_crud.create_notification(
+            session,
+            user_id=request.patient_user_id,
+            type="appointment_rejected",
+            title="Appointment Request Rejected",
+            message=f"{names.doctor} has rejected your appointment request for {_fmt_date(request.preferred_date)} at {_fmt_time(request.preferred_time_slot_start)}",
+            appointment_request_id=request.request_id,
+            related_entity_type="appointment_request",
+            related_entity_id=request.request_id,
+        )
+    return updated_request
+
+
+async def _doctor_suggest_alternative(session, request, update_data, names):
+    # Doctor suggests alternative time
+    if request.appointment_id is None and not request.is_flexible:
+        # INITIAL BOOKING: Can only suggest if patient is flexible
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Patient did not allow alternative suggestions for initial booking"
+        )
+    # For rescheduling, doctor can always suggest alternative (no is_flexible check needed)
+
+    if not update_data.suggested_date or not update_data.suggested_time_slot_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Suggested date and time slot are required when suggesting an alternative"
+        )
+
+    context_msg = "for rescheduling" if _is_reschedule_request(request) else "for your appointment request"
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="doctor_suggested_alternative",
+        suggested_date=update_data.suggested_date,
+        suggested_time_slot_start=update_data.suggested_time_slot_start,
+        notes=update_data.notes,
+    )
+    if updated_request:
+        await notification_crud.create_notification(
+            session,
+            user_id=request.patient_user_id,
+            type="appointment_suggested",
+            title="Alternative Time Suggested",
+            message=f"{names.doctor} has suggested an alternative time {context_msg}: {_fmt_date(update_data.suggested_date)} at {_fmt_time(update_data.suggested_time_slot_start)}",
+            appointment_request_id=request.request_id,
+            appointment_id=request.appointment_id,
+            related_entity_type="appointment_request",
+            related_entity_id=request.request_id,
+        )
+    return updated_request
+
+
+def _require_suggested_slot(request) -> None:
+    if not request.suggested_date or not request.suggested_time_slot_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No alternative time was suggested by the doctor"
+        )
+
+
+def _alternative_accepted_notification(request, names, context_msg: str, appointment_ref_id: int) -> dict:
+    return dict(
+        user_id=request.doctor_user_id,
+        type="appointment_confirmed",
+        title="Appointment Confirmed",
+        message=f"{names.patient} has accepted your suggested alternative time for {context_msg}. Appointment confirmed for {_fmt_date(request.suggested_date)} at {_fmt_time(request.suggested_time_slot_start)}",
+        appointment_request_id=request.request_id,
+        appointment_id=appointment_ref_id,
+        related_entity_type="appointment",
+        related_entity_id=appointment_ref_id,
+    )
+
+
+async def _patient_accept_alternative_reschedule(session, request, update_data, names):
+    # RESCHEDULING: Update existing appointment with the doctor's suggested time
+    _require_doctor_suggestion(request, "accept")
+    _require_suggested_slot(request)
+    combined_datetime = request.suggested_datetime
+    appointment = _require_linked_appointment(
+        request, f"Appointment with ID {request.appointment_id} not found"
+    )
+
+    # Increment reschedule count when patient accepts doctor's alternative in reschedule;
+    # the increment and limit check happen atomically in the UPDATE
+    rescheduled = await appointment_crud.update_appointment(
+        session,
+        request.appointment_id,
+        appointment_date=combined_datetime,
+        status=appointment.status or "scheduled",
+        notes=request.notes,
+        reschedule_count=appointment_crud.INCREMENT,
+        max_reschedule_count=MAX_RESCHEDULE_COUNT,
+    )
+    if not rescheduled:
+        _raise_reschedule_not_applied(
+            request, f"Appointment with ID {request.appointment_id} not found"
+        )
+
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="confirmed",
+        preferred_date=combined_datetime,
+        preferred_time_slot_start=request.suggested_time_slot_start,
+        suggested_date=None,
+        suggested_time_slot_start=None,
+    )
+    # Notify doctor
+    if updated_request:
+        await notification_crud.create_notification(session, **_alternative_accepted_notification(request, names, "reschedule", request.appointment_id))
+    return updated_request
+
+
+async def _patient_accept_alternative_initial(session, request, update_data, names):
+    # INITIAL BOOKING: Create appointment with the doctor's suggested time
+    _require_doctor_suggestion(request, "accept")
+    _require_suggested_slot(request)
+    combined_datetime = request.suggested_datetime
+
+    appointment = await appointment_crud.create_appointment(
+        session,
+        patient_user_id=request.patient_user_id,
+        doctor_user_id=request.doctor_user_id,
+        clinic_id=request.clinic_id,
+        appointment_date=combined_datetime,
+        duration_minutes=30,
+        status="scheduled",
+        appointment_type="consultation",
+        reason=request.reason,
+        notes=request.notes,
+    )
+
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="confirmed",
+        appointment_id=appointment.appointment_id,
+        preferred_date=combined_datetime,
+        preferred_time_slot_start=request.suggested_time_slot_start,
+        suggested_date=None,
+        suggested_time_slot_start=None,
+    )
+    # Notify doctor
+    if updated_request:
+        await notification_crud.create_notification(session, **_alternative_accepted_notification(request, names, "appointment request", appointment.appointment_id))
+    return updated_request
+
+
+async def _patient_reject_alternative_reschedule(session, request, update_data, names):
+    # RESCHEDULING: Patient rejects alternative - keep original appointment time
+    _require_doctor_suggestion(request, "reject")
+    appointment = _require_linked_appointment(request)
+    original_datetime = appointment.appointment_date
+    original_time = appointment.appointment_date.time()
+
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="confirmed",
+        preferred_date=original_datetime,
+        preferred_time_slot_start=original_time,
+        suggested_date=None,
+        suggested_time_slot_start=None,
+        notes=update_data.notes,
+    )
+    if updated_request:
+        await notification_crud.create_notification(
+            session,
+            user_id=request.doctor_user_id,
+            type="appointment_confirmed",
+            title="Patient kept original appointment time",
+            message=f"{names.patient} has declined the suggested alternative for rescheduling. The appointment remains confirmed for its original time.",
+            appointment_request_id=request.request_id,
+            appointment_id=request.appointment_id,
+            related_entity_type="appointment",
+            related_entity_id=request.appointment_id,
+        )
+    return updated_request
+
+
+async def _patient_reject_alternative_initial(session, request, update_data, names):
+    # INITIAL BOOKING: Patient rejects alternative - cancel the request
+    _require_doctor_suggestion(request, "reject")
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="cancelled",
+        notes=update_data.notes,
+    )
+    if updated_request:
+        await notification_crud.create_notification(
+            session,
+            user_id=request.doctor_user_id,
+            type="appointment_cancelled",
+            title="Alternative Time Rejected",
+            message=f"{names.patient} has rejected your suggested alternative time. The appointment request has been cancelled.",
+            appointment_request_id=request.request_id,
+            related_entity_type="appointment_request",
+            related_entity_id=request.request_id,
+        )
+    return updated_request
+
+
+async def _patient_request_reschedule(session, request, update_data, names):
+    # Patient requests reschedule
+    if request.status is not AppointmentRequestStatus.confirmed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Reschedule requests can only be made for confirmed appointments"
+        )
+    if not request.appointment_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Appointment ID is required for reschedule requests"
+        )
+    if not update_data.preferred_date or not update_data.preferred_time_slot_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Preferred date and time are required to request a reschedule"
+        )
+
+    # Check reschedule count (max 2 reschedules allowed)
+    appointment = _require_linked_appointment(request)
+    if appointment.reschedule_count >= MAX_RESCHEDULE_COUNT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximum reschedule limit ({MAX_RESCHEDULE_COUNT}) has been reached for this appointment"
+        )
+
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="pending",
+        preferred_date=update_data.preferred_date,
+        preferred_time_slot_start=update_data.preferred_time_slot_start,
+        suggested_date=None,
+        suggested_time_slot_start=None,
+        notes=update_data.notes,
+    )
+    if updated_request:
+        await notification_crud.create_notification(
+            session,
+            user_id=request.doctor_user_id,
+            type="appointment_request",
+            title="Appointment Reschedule Requested",
+            message=f"{names.patient} requested to reschedule the appointment to {_fmt_date(update_data.preferred_date)} at {_fmt_time(update_data.preferred_time_slot_start)}.",
+            appointment_request_id=request.request_id,
+            appointment_id=request.appointment_id,
+            related_entity_type="appointment_request",
+            related_entity_id=request.request_id,
+        )
+    return updated_request
+
+
+async def _patient_cancel(session, request, update_data, names):
+    # Patient can cancel any appointment request (pending or confirmed)
+    cancellation_note = f"Cancelled by patient. {update_data.notes or ''}".strip()
+    # Read before the UPDATE ... RETURNING, which resets the request's relationships
+    appointment = request.appointment
+
+    # Update request status to "cancelled"
+    updated_request = await appointment_request_crud.update_appointment_request(
+        session,
+        request.request_id,
+        status="cancelled",
+        notes=cancellation_note,
+    )
+    if updated_request:
+        await notification_crud.create_notification(
+            session,
+            user_id=request.doctor_user_id,
+            type="appointment_cancelled",
+            title="Appointment Cancelled by Patient",
+            message=f"{names.patient} has cancelled the appointment request for {_fmt_date(request.preferred_date)} at {_fmt_time(request.preferred_time_slot_start)}.",
+            appointment_request_id=request.request_id,
+            appointment_id=request.appointment_id,
+            related_entity_type="appointment_request" if not request.appointment_id else "appointment",
+            related_entity_id=request.appointment_id or request.request_id,
+        )
+
+    # If there's a confirmed appointment, also cancel it
+    if request.appointment_id and appointment:
+        await appointment_crud.update_appointment(
+            session,
+            request.appointment_id,
+            status="cancelled",
+            notes=cancellation_note,
+        )
+    return updated_request
+
+
+def _is_reschedule_request(request) -> bool:
+    # A pending request that already has an appointment is a patient's reschedule request
+    return (
+        request.appointment_id is not None
+        and request.appointment_id > 0
+        and request.status is AppointmentRequestStatus.pending
+    )
+
+
+# (acting role, requested status, reschedule flow) -> handler. Doctors' flow is
+# _is_reschedule_request; patients' flow is whether an appointment already exists.
+_PATCH_HANDLERS = {
+    ("doctor", AppointmentRequestStatus.accepted, True): _doctor_accept_reschedule,
+    ("doctor", AppointmentRequestStatus.accepted, False): _doctor_accept_initial,
+    ("doctor", AppointmentRequestStatus.rejected, True): _doctor_reject_reschedule,
+    ("doctor", AppointmentRequestStatus.rejected, False): _doctor_reject_initial,
+    ("doctor", AppointmentRequestStatus.doctor_suggested_alternative, True): _doctor_suggest_alternative,
+    ("doctor", AppointmentRequestStatus.doctor_suggested_alternative, False): _doctor_suggest_alternative,
+    ("patient", AppointmentRequestStatus.patient_accepted_alternative, True): _patient_accept_alternative_reschedule,
+    ("patient", AppointmentRequestStatus.patient_accepted_alternative, False): _patient_accept_alternative_initial,
+    ("patient", AppointmentRequestStatus.patient_rejected_alternative, True): _patient_reject_alternative_reschedule,
+    ("patient", AppointmentRequestStatus.patient_rejected_alternative, False): _patient_reject_alternative_initial,
+    ("patient", AppointmentRequestStatus.pending, True): _patient_request_reschedule,
+    ("patient", AppointmentRequestStatus.pending, False): _patient_request_reschedule,
+    ("patient", AppointmentRequestStatus.cancelled, True): _patient_cancel,
+    ("patient", AppointmentRequestStatus.cancelled, False): _patient_cancel,
+}
 
 
 @router.patch("/{request_id}", response_model=AppointmentRequestRead)
@@ -181,7 +714,7 @@ async def update_appointment_request(
 ):
     """Update an appointment request (doctor can accept/reject/suggest alternative, patient can accept/reject alternative)"""
     try:
-        request = await appointment_request_crud.get_appointment_request_by_id(
+        request = await appointment_request_crud.get_appointment_request_with_parties(
             session,
             request_id,
         )
@@ -191,505 +724,59 @@ async def update_appointment_request(
                 detail="Appointment request not found"
             )
 
-        role_value = get_role_value(current_user.role)
-        is_doctor = role_value == "doctor"
-        is_patient = current_user.is_patient
-
-        has_doctor_permission = is_doctor and request.doctor_user_id == current_user.id
-        has_patient_permission = is_patient and request.patient_user_id == current_user.id
-
-        if not (has_doctor_permission or has_patient_permission):
+        if current_user.role_str == "doctor" and request.doctor_user_id == current_user.id:
+            acting_role = "doctor"
+            is_reschedule = _is_reschedule_request(request)
+        elif current_user.is_patient and request.patient_user_id == current_user.id:
+            acting_role = "patient"
+            is_reschedule = request.appointment_id is not None
+        else:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You don't have permission to update this appointment request"
             )
 
         new_status = update_data.status
-        doctor = await auth_crud.get_user_by_id(request.doctor_user_id, session)
-        patient = await auth_crud.get_user_by_id(request.patient_user_id, session)
-        doctor_name = f"{doctor.first_name} {doctor.last_name}".strip() if doctor else "Doctor"
-        patient_name = f"{patient.first_name} {patient.last_name}".strip() if patient else "Patient"
-        
-        # Handle status conversion - check if it's an enum or string
-        if hasattr(request.status, "value"):
-            current_status = str(request.status.value)
-        elif isinstance(request.status, str):
-            current_status = request.status.strip()
-        else:
-            current_status = str(request.status or "").strip()
-
-        if has_doctor_permission:
-            # Determine if this is a reschedule request (has appointment_id and was confirmed)
-            is_reschedule_request = request.appointment_id is not None and current_status == "pending" and request.appointment_id > 0
-            is_initial_booking = request.appointment_id is None
-
-            if new_status == "accepted":
-                if not request.preferred_date or not request.preferred_time_slot_start:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Preferred date and time are required to accept an appointment request"
-                    )
-
-                preferred_date_naive = request.preferred_date.replace(tzinfo=None) if request.preferred_date.tzinfo else request.preferred_date
-                combined_datetime = datetime.combine(
-                    preferred_date_naive.date(),
-                    request.preferred_time_slot_start
-                )
-                if request.preferred_date.tzinfo:
-                    combined_datetime = combined_datetime.replace(tzinfo=request.preferred_date.tzinfo)
-
-                if is_reschedule_request:
-                    # RESCHEDULING: Doctor accepts reschedule request
-                    appointment = await appointment_crud.get_appointment_by_id(session, request.appointment_id)
-                    if not appointment:
-                        raise HTTPException(
-                            status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Appointment not found"
-                        )
-                    
-                    # Update appointment time and increment reschedule count
-                    await appointment_crud.update_appointment(
-                        session,
-                        request.appointment_id,
-                        appointment_date=combined_datetime,
-                        status="scheduled",
-                        notes=update_data.notes or request.notes,
-                        reschedule_count=appointment.reschedule_count + 1,
-                    )
-                    await appointment_request_crud.update_appointment_request(
-                        session,
-                        request_id,
-                        status="confirmed",
-                        preferred_date=combined_datetime,
-                        preferred_time_slot_start=request.preferred_time_slot_start,
-                        suggested_date=None,
-                        suggested_time_slot_start=None,
-                        notes=update_data.notes,
-                    )
-                    appointment_record_id = request.appointment_id
-                    notification_type = "appointment_confirmed"
-                    notification_title = "Appointment Reschedule Confirmed"
-                    notification_message = f"{doctor_name} approved your reschedule request for {combined_datetime.strftime('%Y-%m-%d')} at {request.preferred_time_slot_start.strftime('%H:%M')}."
-                else:
-                    # INITIAL BOOKING: Doctor accepts initial appointment request
-                    appointment = await appointment_crud.create_appointment(
-                        session,
-                        patient_user_id=request.patient_user_id,
-                        doctor_user_id=request.doctor_user_id,
-                        clinic_id=request.clinic_id,
-                        appointment_date=combined_datetime,
-                        duration_minutes=30,
-                        status="scheduled",
-                        appointment_type="consultation",
-                        reason=request.reason,
-                        notes=request.notes,
-                    )
-                    await appointment_request_crud.update_appointment_request(
-                        session,
-                        request_id,
-                        status="confirmed",
-                        appointment_id=appointment.appointment_id,
-                        notes=update_data.notes,
-                    )
-                    appointment_record_id = appointment.appointment_id
-                    notification_type = "appointment_accepted"
-                    notification_title = "Appointment Accepted"
-                    notification_message = f"{doctor_name} has accepted your appointment request for {request.preferred_date.strftime('%Y-%m-%d')} at {request.preferred_time_slot_start.strftime('%H:%M')}."
-
-                await notification_crud.create_notification(
-                    session,
-                    user_id=request.patient_user_id,
-                    type=notification_type,
-                    title=notification_title,
-                    message=notification_message,
-                    appointment_request_id=request_id,
-                    appointment_id=appointment_record_id,
-                    related_entity_type="appointment",
-                    related_entity_id=appointment_record_id,
-                )
-
-            elif new_status == "rejected":
-                if is_reschedule_request:
-                    # RESCHEDULING: Doctor rejects reschedule request - appointment stays same
-                    appointment = await appointment_crud.get_appointment_by_id(session, request.appointment_id)
-                    if not appointment:
-                        raise HTTPException(
-                            status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Appointment not found"
-                        )
-                    original_datetime = appointment.appointment_date
-                    original_time = appointment.appointment_date.time()
-                    
-                    await appointment_request_crud.update_appointment_request(
-                        session,
-                        request_id,
-                        status="confirmed",
-                        preferred_date=original_datetime,
-                        preferred_time_slot_start=original_time,
-                        suggested_date=None,
-                        suggested_time_slot_start=None,
-                        notes=update_data.notes,
-                    )
-
-                    await notification_crud.create_notification(
-                        session,
-                        user_id=request.patient_user_id,
-                        type="appointment_confirmed",
-                        title="Reschedule Request Rejected",
-                        message=f"{doctor_name} has rejected your reschedule request. The appointment remains confirmed for its original time.",
-                        appointment_request_id=request_id,
-                        appointment_id=request.appointment_id,
-                        related_entity_type="appointment",
-                        related_entity_id=request.appointment_id,
-                    )
-                else:
-                    # INITIAL BOOKING: Doctor rejects initial appointment request
-                    await appointment_request_crud.update_appointment_request(
-                        session,
-                        request_id,
-                        status=new_status,
-                        notes=update_data.notes,
-                    )
-
-                    await notification_crud.create_notification(
-                        session,
-                        user_id=request.patient_user_id,
-                        type="appointment_rejected",
-                        title="Appointment Request Rejected",
-                        message=f"{doctor_name} has rejected your appointment request for {request.preferred_date.strftime('%Y-%m-%d')} at {request.preferred_time_slot_start.strftime('%H:%M')}",
-                        appointment_request_id=request_id,
-                        related_entity_type="appointment_request",
-                        related_entity_id=request_id,
-                    )
-
-            elif new_status == "doctor_suggested_alternative":
-                # Doctor suggests alternative time
-                if is_initial_booking and not request.is_flexible:
-                    # INITIAL BOOKING: Can only suggest if patient is flexible
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Patient did not allow alternative suggestions for initial booking"
-                    )
-                # For rescheduling, doctor can always suggest alternative (no is_flexible check needed)
-                
-                if not update_data.suggested_date or not update_data.suggested_time_slot_start:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Suggested date and time slot are required when suggesting an alternative"
-                    )
-
-                await appointment_request_crud.update_appointment_request(
-                    session,
-                    request_id,
-                    status=new_status,
-                    suggested_date=update_data.suggested_date,
-                    suggested_time_slot_start=update_data.suggested_time_slot_start,
-                    notes=update_data.notes,
-                )
-
-                context_msg = "for rescheduling" if is_reschedule_request else "for your appointment request"
-                await notification_crud.create_notification(
-                    session,
-                    user_id=request.patient_user_id,
-                    type="appointment_suggested",
-                    title="Alternative Time Suggested",
-                    message=f"{doctor_name} has suggested an alternative time {context_msg}: {update_data.suggested_date.strftime('%Y-%m-%d')} at {update_data.suggested_time_slot_start.strftime('%H:%M')}",
-                    appointment_request_id=request_id,
-                    appointment_id=request.appointment_id,
-                    related_entity_type="appointment_request",
-                    related_entity_id=request_id,
-                )
-
-        elif has_patient_permission:
-            if new_status == "patient_accepted_alternative":
-                # Patient accepts the doctor's suggested alternative time
-                if current_status != "doctor_suggested_alternative":
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Can only accept alternative when doctor has suggested one. Current status: {current_status}"
-                    )
-                
-                if not request.suggested_date or not request.suggested_time_slot_start:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="No alternative time was suggested by the doctor"
-                    )
-
-                # Combine suggested date and time into datetime
-                suggested_date_naive = request.suggested_date.replace(tzinfo=None) if request.suggested_date.tzinfo else request.suggested_date
-                combined_datetime = datetime.combine(
-                    suggested_date_naive.date(),
-                    request.suggested_time_slot_start
-                )
-                if request.suggested_date.tzinfo:
-                    combined_datetime = combined_datetime.replace(tzinfo=request.suggested_date.tzinfo)
-                
-                is_reschedule_flow = request.appointment_id is not None
-                
-                if is_reschedule_flow:
-                    # RESCHEDULING: Update existing appointment (reschedule flow)
-                    appointment = await appointment_crud.get_appointment_by_id(session, request.appointment_id)
-                    if not appointment:
-                        raise HTTPException(
-                            status_code=status.HTTP_404_NOT_FOUND,
-                            detail=f"Appointment with ID {request.appointment_id} not found"
-                        )
-                    # Increment reschedule count when patient accepts doctor's alternative in reschedule
-                    await appointment_crud.update_appointment(
-                        session,
-                        request.appointment_id,
-                        appointment_date=combined_datetime,
-                        status=appointment.status or "scheduled",
-                        notes=request.notes,
-                        reschedule_count=appointment.reschedule_count + 1,
-                    )
-                    final_datetime = combined_datetime
-                    await appointment_request_crud.update_appointment_request(
-                        session,
-                        request_id,
-                        status="confirmed",
-                        preferred_date=final_datetime,
-                        preferred_time_slot_start=request.suggested_time_slot_start,
-                        suggested_date=None,
-                        suggested_time_slot_start=None,
-                    )
-                    appointment_ref_id = request.appointment_id
-                else:
-                    # INITIAL BOOKING: Create appointment with suggested time
-                    appointment = await appointment_crud.create_appointment(
-                        session,
-                        patient_user_id=request.patient_user_id,
-                        doctor_user_id=request.doctor_user_id,
-                        clinic_id=request.clinic_id,
-                        appointment_date=combined_datetime,
-                        duration_minutes=30,
-                        status="scheduled",
-                        appointment_type="consultation",
-                        reason=request.reason,
-                        notes=request.notes,
-                    )
-                    appointment_ref_id = appointment.appointment_id
-                    await appointment_request_crud.update_appointment_request(
-                        session,
-                        request_id,
-                        status="confirmed",
-                        appointment_id=appointment_ref_id,
-                        preferred_date=combined_datetime,
-                        preferred_time_slot_start=request.suggested_time_slot_start,
-                        suggested_date=None,
-                        suggested_time_slot_start=None,
-                    )
-
-                # Notify doctor
-                context_msg = "reschedule" if is_reschedule_flow else "appointment request"
-                await notification_crud.create_notification(
-                    session,
-                    user_id=request.doctor_user_id,
-                    type="appointment_confirmed",
-                    title="Appointment Confirmed",
-                    message=f"{patient_name} has accepted your suggested alternative time for {context_msg}. Appointment confirmed for {request.suggested_date.strftime('%Y-%m-%d')} at {request.suggested_time_slot_start.strftime('%H:%M')}",
-                    appointment_request_id=request_id,
-                    appointment_id=appointment_ref_id,
-                    related_entity_type="appointment",
-                    related_entity_id=appointment_ref_id,
-                )
-
-            elif new_status == "patient_rejected_alternative":
-                # Patient rejects the doctor's suggested alternative time
-                if current_status != "doctor_suggested_alternative":
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Can only reject alternative when doctor has suggested one. Current status: {current_status}"
-                    )
-                
-                is_reschedule_flow = request.appointment_id is not None
-                
-                if is_reschedule_flow:
-                    # RESCHEDULING: Patient rejects alternative - keep original appointment time
-                    appointment = await appointment_crud.get_appointment_by_id(session, request.appointment_id)
-                    if not appointment:
-                        raise HTTPException(
-                            status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Appointment not found"
-                        )
-                    original_datetime = appointment.appointment_date
-                    original_time = appointment.appointment_date.time()
-                    
-                    await appointment_request_crud.update_appointment_request(
-                        session,
-                        request_id,
-                        status="confirmed",
-                        preferred_date=original_datetime,
-                        preferred_time_slot_start=original_time,
-                        suggested_date=None,
-                        suggested_time_slot_start=None,
-                        notes=update_data.notes,
-                    )
-
-                    await notification_crud.create_notification(
-                        session,
-                        user_id=request.doctor_user_id,
-                        type="appointment_confirmed",
-                        title="Patient kept original appointment time",
-                        message=f"{patient_name} has declined the suggested alternative for rescheduling. The appointment remains confirmed for its original time.",
-                        appointment_request_id=request_id,
-                        appointment_id=request.appointment_id,
-                        related_entity_type="appointment",
-                        related_entity_id=request.appointment_id,
-                    )
-                else:
-                    # INITIAL BOOKING: Patient rejects alternative - cancel the request
-                    await appointment_request_crud.update_appointment_request(
-                        session,
-                        request_id,
-                        status="cancelled",
-                        notes=update_data.notes,
-                    )
-
-                    await notification_crud.create_notification(
-                        session,
-                        user_id=request.doctor_user_id,
-                        type="appointment_cancelled",
-                        title="Alternative Time Rejected",
-                        message=f"{patient_name} has rejected your suggested alternative time. The appointment request has been cancelled.",
-                        appointment_request_id=request_id,
-                        related_entity_type="appointment_request",
-                        related_entity_id=request_id,
-                    )
-
-            elif new_status == "pending":
-                # Patient requests reschedule
-                if current_status != "confirmed":
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Reschedule requests can only be made for confirmed appointments"
-                    )
-                if not request.appointment_id:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Appointment ID is required for reschedule requests"
-                    )
-                if not update_data.preferred_date or not update_data.preferred_time_slot_start:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Preferred date and time are required to request a reschedule"
-                    )
-
-                # Check reschedule count (max 2 reschedules allowed)
-                appointment = await appointment_crud.get_appointment_by_id(session, request.appointment_id)
-                if not appointment:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Appointment not found"
-                    )
-                
-                if appointment.reschedule_count >= 2:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Maximum reschedule limit (2) has been reached for this appointment"
-                    )
-
-                await appointment_request_crud.update_appointment_request(
-                    session,
-                    request_id,
-                    status="pending",
-                    preferred_date=update_data.preferred_date,
-                    preferred_time_slot_start=update_data.preferred_time_slot_start,
-                    suggested_date=None,
-                    suggested_time_slot_start=None,
-                    notes=update_data.notes,
-                )
-
-                await notification_crud.create_notification(
-                    session,
-                    user_id=request.doctor_user_id,
-                    type="appointment_request",
-                    title="Appointment Reschedule Requested",
-                    message=f"{patient_name} requested to reschedule the appointment to {update_data.preferred_date.strftime('%Y-%m-%d')} at {update_data.preferred_time_slot_start.strftime('%H:%M')}.",
-                    appointment_request_id=request_id,
-                    appointment_id=request.appointment_id,
-                    related_entity_type="appointment_request",
-                    related_entity_id=request_id,
-                )
-
-            elif new_status == "cancelled":
-                # Patient can cancel any appointment request (pending or confirmed)
-                cancellation_note = f"Cancelled by patient. {update_data.notes or ''}".strip()
-                
-                # Update request status to "cancelled"
-                await appointment_request_crud.update_appointment_request(
-                    session,
-                    request_id,
-                    status="cancelled",
-                    notes=cancellation_note,
-                )
-                
-                # If there's a confirmed appointment, also cancel it
-                if request.appointment_id:
-                    appointment = await appointment_crud.get_appointment_by_id(
-                        session,
-                        request.appointment_id,
-                    )
-                    if appointment:
-                        await appointment_crud.update_appointment(
-                            session,
-                            request.appointment_id,
-                            status="cancelled",
-                            notes=cancellation_note,
-                        )
-                
-                # Notify doctor
-                await notification_crud.create_notification(
-                    session,
-                    user_id=request.doctor_user_id,
-                    type="appointment_cancelled",
-                    title="Appointment Cancelled by Patient",
-                    message=f"{patient_name} has cancelled the appointment request for {request.preferred_date.strftime('%Y-%m-%d')} at {request.preferred_time_slot_start.strftime('%H:%M')}.",
-                    appointment_request_id=request_id,
-                    appointment_id=request.appointment_id,
-                    related_entity_type="appointment_request" if not request.appointment_id else "appointment",
-                    related_entity_id=request.appointment_id or request_id,
-                )
-            
-            else:
+        try:
+            requested_status = AppointmentRequestStatus(new_status)
+        except ValueError:
+            requested_status = None
+        handler = _PATCH_HANDLERS.get((acting_role, requested_status, is_reschedule))
+        if handler is None:
+            if acting_role == "patient":
                 # Patient cannot perform any other status updates
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Invalid status update for patient: {new_status}. Patients can accept/reject doctor-suggested alternatives or cancel appointments."
                 )
-        
+            # Doctors' other status values leave the request unchanged
+            updated_request = request
         else:
-            # User doesn't have permission to update this appointment request
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to update this appointment request"
+            # Doctor, patient and linked appointment arrive with the request's JOINed load
+            doctor = request.doctor
+            patient = request.patient
+            names = _PartyNames(
+                doctor=f"{doctor.first_name} {doctor.last_name}".strip() if doctor else "Doctor",
+                patient=f"{patient.first_name} {patient.last_name}".strip() if patient else "Patient",
             )
+            updated_request = await handler(session, request, update_data, names)
 
-        updated_request = await appointment_request_crud.get_appointment_request_by_id(
-            session,
-            request_id,
-        )
-        
         if not updated_request:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Appointment request not found after update"
             )
+        await _invalidate_request_lists(request.patient_user_id, request.doctor_user_id)
         
-        # The Pydantic schema should handle enum conversion automatically,
-        # but ensure we're returning the correct format
-        return updated_request
+        return _render(_request_adapter, updated_request)
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
         # Log unexpected errors and return a user-friendly message
-        import traceback
         error_detail = str(e)
-        traceback.print_exc()
-        print(f"Error updating appointment request {request_id}: {error_detail}")
+        logger.exception("Error updating appointment request %s", request_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update appointment request: {error_detail}"
         )
-
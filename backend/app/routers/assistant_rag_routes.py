@@ -1,17 +1,41 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends
-from openai import AsyncOpenAI
-from app.core import config
+from fastapi import (
+    APIRouter,
+    UploadFile,
+    File,
+    HTTPException,
+    BackgroundTasks,
+    Depends,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import ORJSONResponse
+from app.services.assistant_rag.openai_client import client
 from app.services.assistant_rag import rag_utils, indexing, prepare_kb, ocr
 from app.services.auth_utils import decode_token
+from app.services.redis_service import get_cache, set_cache
 
+import hashlib
+import json
+import logging
+import os
+import tempfile
 import uuid
 from app.db import sessionLocal
 from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
+from typing import Dict
 from app.services.assistant_rag import ocr
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
-client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+
+
+MAX_CONCURRENT_KB_PREPARATIONS = 4
+_prepare_kb_semaphore = asyncio.Semaphore(MAX_CONCURRENT_KB_PREPARATIONS)
+# one running preparation per user; repeat triggers fold into it
+_prepare_kb_tasks: Dict[int, asyncio.Task] = {}
 
 
 # run knowledge base preparation in background
@@ -19,8 +43,12 @@ async def _background_prepare_kb(user_id: int):
     """
     Background job: open its own DB session and run RAG preparation.
     """
-    async with sessionLocal() as session:  # new AsyncSession, independent of request
-        await prepare_kb.prepare_user_kb(user_id, session)
+    try:
+        async with _prepare_kb_semaphore:
+            async with sessionLocal() as session:  # new AsyncSession, independent of request
+                await prepare_kb.prepare_user_kb(user_id, session)
+    finally:
+        _prepare_kb_tasks.pop(user_id, None)
 
 
 # route to trigger knowledge base preparation
@@ -28,7 +56,11 @@ async def _background_prepare_kb(user_id: int):
 async def prepare_knowledge_base(
     user_id: int = Depends(decode_token),
 ):
-    asyncio.create_task(_background_prepare_kb(user_id))
+    task = _prepare_kb_tasks.get(user_id)
+    if task is not None and not task.done():
+        return {"detail": "Knowledge base preparation already in progress"}
+
+    _prepare_kb_tasks[user_id] = asyncio.create_task(_background_prepare_kb(user_id))
     return {"detail": "Knowledge base preparation started in background"}
 
 
@@ -48,65 +80,126 @@ async def should_use_rag(question: str) -> bool:
     return answer.startswith("y")
 
 
-# file uploading route
-@router.post("/upload")
-async def upload_document(
-    user_id: int,
-    file: UploadFile = File(...),
+# ingestion job status by job id (= file id): {"user_id", "status", "detail"}. Kept in
+# Redis so any worker can answer /upload/status for a job another worker accepted.
+UPLOAD_JOB_TTL = 24 * 60 * 60
+UPLOAD_FAILED_DETAIL = "Document processing failed"
+
+
+def _upload_job_key(job_id: str) -> str:
+    return f"rag:upload_job:{job_id}"
+
+
+async def _save_upload_job(job_id: str, job: dict):
+    await set_cache(_upload_job_key(job_id), json.dumps(job), ttl=UPLOAD_JOB_TTL)
+
+
+async def _load_upload_job(job_id: str):
+    cached = await get_cache(_upload_job_key(job_id))
+    return json.loads(cached) if cached else None
+
+
+# run an ingestion coroutine in the background and record its outcome
+async def _run_upload_job(job_id: str, user_id: int, ingest):
+    try:
+        await ingest
+    except Exception:
+        # the client only gets a generic message; the cause goes to the logs
+        logger.exception("Upload job %s failed", job_id)
+        job = {"user_id": user_id, "status": "failed", "detail": UPLOAD_FAILED_DETAIL}
+    else:
+        job = {"user_id": user_id, "status": "done", "detail": None}
+    await _save_upload_job(job_id, job)
+
+
+async def _start_upload_job(background_tasks: BackgroundTasks, user_id: int, file_id: str, ingest):
+    await _save_upload_job(file_id, {"user_id": user_id, "status": "processing", "detail": None})
+    background_tasks.add_task(_run_upload_job, file_id, user_id, ingest)
+    return {"job_id": file_id, "status": "processing"}
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# copy the spooled upload to a named temp file that outlives the request,
+# hashing the bytes on the way through; returns (path, content hash)
+def _spool_to_tempfile(upload):
+    digest = hashlib.blake2b(digest_size=16)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        try:
+            upload.seek(0)
+            while chunk := upload.read(1 << 20):
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return tmp.name, digest.hexdigest()
+
+
+# same bytes already indexed for this user? answer with the existing file id
+def _dedup_response(response: Response, user_id: int, content_hash: str):
+    existing = indexing.find_file_by_hash(user_id, content_hash)
+    if existing is None:
+        return None
+    response.status_code = status.HTTP_200_OK
+    return {"file_id": existing["file_id"], "status": "done", "dedup": True}
+
+
+async def _ingest_pdf(
+    user_id: int, file_id: str, file_name: str, pdf_path: str, content_hash: str
 ):
-    # file validation
-    if not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
-    # Read file bytes
-    pdf_bytes = await file.read()
-    pages = rag_utils.extract_text_from_pdf(pdf_bytes)
+    try:
+        # Parse in a worker thread, so the event loop keeps serving other requests
+        pages = await asyncio.to_thread(rag_utils.extract_text_from_pdf, pdf_path)
+    finally:
+        os.remove(pdf_path)
     text = "\n".join(pages)
 
-    # Generate a unique file ID
-    file_id = str(uuid.uuid4())
-
-    # Extract structured data from the entire document
-    structured = await rag_utils.extract_structured_data(text)
-    # Extract dates
-    doc_dates = rag_utils.extract_dates(text)
+    # Structured extraction, date extraction and LLM section splitting are independent,
+    # so run them concurrently
+    structured, doc_dates, sections = await asyncio.gather(
+        rag_utils.extract_structured_data(text),
+        asyncio.to_thread(rag_utils.extract_dates, text),
+        rag_utils.split_into_sections(pages),
+    )
     if structured and "tests" in structured:
         for test in structured["tests"]:
             test["date"] = doc_dates[0] if doc_dates else None
 
-    # Split into meaningful sections using LLM
-    sections = await rag_utils.split_into_sections(pages)
-
-    # Process each section individually and store it with metadata. This allows finer retrieval later.
-    for section in sections:
-        section_text = section["text"]
-
-        metadata = {
+    # Store each section with its own metadata (finer retrieval later); all sections
+    # are embedded and written to the index together
+    metadatas = [
+        {
             "file_id": file_id,
-            "file_name": file.filename,
+            "file_name": file_name,
             "file_type": "pdf",  # could be extended later
             "section_name": section["section_name"],
             "page_start": section["page_start"],
             "page_end": section["page_end"],
             "structured": structured,
             "dates": doc_dates,  ## list of dates found in document for future use
+            "content_hash": content_hash,
         }
-        await indexing.store_document(
-            user_id,
-            section_text,
-            metadata=metadata,
-        )
-
-
-# upload image router with OCR
-@router.post("/upload_image")
-async def upload_image(user_id: int, file: UploadFile = File(...)):
-    # validate type
-    if not file.filename.lower().endswith((".png", ".jpg", ".jpeg")):
-        raise HTTPException(status_code=400, detail="Only PNG/JPG images allowed")
+        for section in sections
+    ]
+    await indexing.store_documents_bulk(
+        user_id,
+        [section["text"] for section in sections],
+        metadatas,
+    )
 
-    image_bytes = await file.read()
-    mime_type = file.content_type  # e.g., "image/jpeg" or "image/png"
 
+async def _ingest_image(
+    user_id: int,
+    file_id: str,
+    file_name: str,
+    image_bytes: bytes,
+    mime_type: str,
+    content_hash: str,
+):
     detect_handwritten = await ocr.detect_handwritten(image_bytes, mime_type)
     if detect_handwritten:
         text = await ocr.extract_handwritten(image_bytes, mime_type)
@@ -114,14 +207,13 @@ async def upload_image(user_id: int, file: UploadFile = File(...)):
         text = await ocr.extract_text_from_image(image_bytes, mime_type)
 
     if not text.strip():
-        raise HTTPException(status_code=400, detail="Could not extract text from image")
-
-    # Generate a unique file ID
-    file_id = str(uuid.uuid4())
+        raise ValueError("Could not extract text from image")
 
     # Extract structured data
-    structured = await rag_utils.extract_structured_data(text)
-    doc_dates = rag_utils.extract_dates(text)
+    structured, doc_dates = await asyncio.gather(
+        rag_utils.extract_structured_data(text),
+        asyncio.to_thread(rag_utils.extract_dates, text),
+    )
 
     if structured and "tests" in structured:
         for test in structured["tests"]:
@@ -129,10 +221,11 @@ async def upload_image(user_id: int, file: UploadFile = File(...)):
 
     metadata = {
         "file_id": file_id,
-        "file_name": file.filename,
+        "file_name": file_name,
         "file_type": "image",
         "structured": structured,
         "dates": doc_dates,
+        "content_hash": content_hash,
     }
 
     await indexing.store_document(
@@ -142,7 +235,101 @@ async def upload_image(user_id: int, file: UploadFile = File(...)):
     )
 
 
+# file uploading route; ingestion runs in the background, poll /upload/status/{job_id}
+@router.post("/upload", status_code=status.HTTP_202_ACCEPTED)
+async def upload_document(
+    user_id: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    file: UploadFile = File(...),
+):
+    # file validation
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+
+    # Generate a unique file ID
+    file_id = str(uuid.uuid4())
+
+    pdf_path, content_hash = await asyncio.to_thread(_spool_to_tempfile, file.file)
+    try:
+        deduped = _dedup_response(response, user_id, content_hash)
+        if deduped is None:
+            # once the job is queued, _ingest_pdf owns the temp file and removes it
+            # whether or not ingestion succeeds
+            return await _start_upload_job(
+                background_tasks,
+                user_id,
+                file_id,
+                _ingest_pdf(user_id, file_id, file.filename, pdf_path, content_hash),
+            )
+    except BaseException:
+        os.remove(pdf_path)
+        raise
+    os.remove(pdf_path)
+    return deduped
+
+
+# upload image router with OCR; ingestion runs in the background
+@router.post("/upload_image", status_code=status.HTTP_202_ACCEPTED)
+async def upload_image(
+    user_id: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    file: UploadFile = File(...),
+):
+    # validate type
+    if not file.filename.lower().endswith((".png", ".jpg", ".jpeg")):
+        raise HTTPException(status_code=400, detail="Only PNG/JPG images allowed")
+
+    image_bytes = await file.read()
+    mime_type = file.content_type  # e.g., "image/jpeg" or "image/png"
+
+    # Generate a unique file ID
+    file_id = str(uuid.uuid4())
+
+    content_hash = _content_hash(image_bytes)
+    deduped = _dedup_response(response, user_id, content_hash)
+    if deduped is not None:
+        return deduped
+
+    return await _start_upload_job(
+        background_tasks,
+        user_id,
+        file_id,
+        _ingest_image(
+            user_id, file_id, file.filename, image_bytes, mime_type, content_hash
+        ),
+    )
+
+
+@router.get("/upload/status/{job_id}")
+async def upload_status(job_id: str, user_id: int):
+    job = await _load_upload_job(job_id)
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return {"job_id": job_id, "status": job["status"], "detail": job["detail"]}
+
+
+# GET so browsers can revalidate it (POST kept for existing callers). The ETag covers
+# the knowledge-base version, so new uploads change it, and no-cache makes the browser
+# check it on every reuse. Both methods take the question as a query parameter (the
+# original POST contract); private keeps shared caches from storing the answer.
+@router.get("/query")
 @router.post("/query")
-async def question_rag(user_id: int, question: str):
-    result = await indexing.query_rag(user_id, question)
-    return result
+async def question_rag(user_id: int, question: str, request: Request):
+    etag = '"{}"'.format(
+        hashlib.blake2b(
+            f"{user_id}:{indexing.kb_version(user_id)}:{question}".encode("utf-8"),
+            digest_size=8,
+        ).hexdigest()
+    )
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    # repeated and near-duplicate questions are answered from the per-user caches
+    result = await indexing.cached_query_rag(user_id, question)
+    return ORJSONResponse(result, headers=cache_headers)
@@ -1,7 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Cookie
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    status,
+    Response,
+    Cookie,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from db import get_session
 from db.crud import auth_crud as crud, address_crud
+from db.models.user_model import UserRoleEnum
+from schemas.user_schema import UserRole
 from schemas import (
     CreateUser,
     UserLogin,
@@ -10,15 +19,69 @@ from schemas import (
     AddressUpdate,
     AddressRead,
 )
-from services import create_tokens, hash_password, verify_password, verify_access_token
-from datetime import datetime
-import json
+from services import (
+    create_tokens,
+    hash_password,
+    hash_refresh_token,
+    password_needs_rehash,
+    verify_password,
+    verify_access_token,
+)
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
 from core import config
 
 router = APIRouter()
 
 ACCESS_TOKEN_MAX_AGE = config.ACCESS_TOKEN_EXPIRE_MIN * 60
 
+# Attributes shared by every auth cookie, fixed per environment:
+# Production: Secure + SameSite=none for cross-domain (Vercel -> Railway)
+# Development: SameSite=Lax for localhost
+_COOKIE_ATTRS = "; HttpOnly; Path=/" + (
+    "; SameSite=none; Secure" if config.is_production else "; SameSite=Lax"
+)
+
+_SERVICE_PROVIDER_ROLES = frozenset({"doctor", "pharmacist", "insurer"})
+
+# Login role resolution: (selected role kind, account is_patient, account's service
+# provider role vs the selected one) -> action. Kinds are "patient", "provider" or
+# None (no/unknown role selected); role match is "none", "same" or "other".
+# Combinations not listed (including every None kind) fall back to "login_default".
+_LOGIN_ACTIONS = {
+    # Selected patient
+    ("patient", True, "none"): "login_patient",
+    ("patient", True, "same"): "login_patient",
+    ("patient", True, "other"): "login_patient",
+    ("patient", False, "none"): "prompt_service_provider_to_patient",
+    ("patient", False, "same"): "prompt_service_provider_to_patient",
+    ("patient", False, "other"): "prompt_service_provider_to_patient",
+    # Selected doctor/pharmacist/insurer
+    ("provider", True, "same"): "login_selected_role",
+    ("provider", False, "same"): "login_selected_role",
+    ("provider", True, "other"): "role_conflict",
+    ("provider", False, "other"): "role_conflict",
+    ("provider", True, "none"): "prompt_patient_to_service_provider",
+    # Not a patient and no role shouldn't happen; honour the selection
+    ("provider", False, "none"): "login_selected_role",
+}
+
+# Fields of CreateUser that must not be written to the users row as-is
+_EXCLUDE_PASSWORD = frozenset({"password"})
+
+# Service provider role value -> display label ("doctor" -> "Doctor") and API enum
+_ROLE_DISPLAY = {role.value: role.value.capitalize() for role in UserRoleEnum}
+_READ_ROLES = {role.value: UserRole(role.value) for role in UserRoleEnum}
+
+# Signup role string -> enum for upgrading a patient to a service provider
+_ROLE_MAP = {
+    "doctor": UserRoleEnum.doctor,
+    "pharmacist": UserRoleEnum.pharmacist,
+    "insurer": UserRoleEnum.insurer,
+}
+
 
 # Health check endpoint
 @router.get("/health")
@@ -27,28 +90,73 @@ async def health_check():
     return {"status": "healthy", "service": "medilink-backend"}
 
 
-# Dependency to get current user from access token
-async def get_current_user(
-    access_token: str = Cookie(None), session: AsyncSession = Depends(get_session)
-):
+@dataclass(frozen=True, slots=True)
+class TokenUser:
+    """Caller identity from the verified access token: user id and the role logged in as.
+
+    Endpoints that need profile fields (name, email, patient flag) depend on
+    get_current_user_fresh instead, so those are always read from the users row.
+    """
+
+    id: int
+    role: Optional[str]
+
+
+def _require_access_token(access_token: Optional[str]) -> str:
     if not access_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
         )
+    return access_token
 
-    payload = await verify_access_token(access_token)
-    user_id = int(payload.get("sub"))
 
-    user = await crud.get_user_by_id(user_id, session)
+async def _load_user(payload: dict, session: AsyncSession):
+    user = await crud.get_user_by_id(int(payload.get("sub")), session)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
-
     return user
 
 
+# Dependency to get current user from access token: signature check only, the
+# returned TokenUser carries just the token's subject and role
+async def get_current_user(access_token: str = Cookie(None)) -> TokenUser:
+    payload = await verify_access_token(_require_access_token(access_token))
+    return TokenUser(id=int(payload["sub"]), role=payload.get("role"))
+
+
+# Dependency for endpoints that only need the caller's id: signature check only,
+# no user lookup or DB session
+async def get_current_user_id(access_token: str = Cookie(None)) -> int:
+    payload = await verify_access_token(_require_access_token(access_token))
+    return int(payload["sub"])
+
+
+# Dependency for endpoints that need the full, current User row
+async def get_current_user_fresh(
+    access_token: str = Cookie(None), session: AsyncSession = Depends(get_session)
+):
+    payload = await verify_access_token(_require_access_token(access_token))
+    return await _load_user(payload, session)
+
+
+def _check_signup_role_addable(existing_user, is_patient_account: bool) -> None:
+    """Signup on a taken email may only add the role the account doesn't have yet."""
+    if is_patient_account:
+        # Already has patient account - error
+        already_has_role = existing_user.is_patient
+    else:
+        # Already has a service provider role - cannot change
+        already_has_role = existing_user.role_str is not None
+    if already_has_role:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already in use! Please sign in",
+        )
+
+
 # API Endpoints
 @router.post("/signup", response_model=ReadUser)
 async def create_user(user: CreateUser, session: AsyncSession = Depends(get_session)):
@@ -56,108 +164,8 @@ async def create_user(user: CreateUser, session: AsyncSession = Depends(get_sess
     is_patient_account = user.role == "patient"
     service_provider_role = user.role if not is_patient_account else None
 
-    # Check if email already exists (phone number is not unique - can be used for multiple accounts)
-    existing_user_by_email = await crud.check_user_by_email(user.email, session)
-
-    if existing_user_by_email:
-        # Email exists - check if we can add the complementary role
-        existing_is_patient = existing_user_by_email.is_patient
-        existing_role = existing_user_by_email.role
-        existing_role_value = (
-            existing_role.value
-            if existing_role and hasattr(existing_role, "value")
-            else str(existing_role) if existing_role else None
-        )
-
-        if is_patient_account:
-            # Trying to create patient account
-            if existing_is_patient:
-                # Already has patient account - error
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already in use! Please sign in",
-                )
-            else:
-                # Email exists as service provider - can add patient account via signup
-                # Verify password matches
-                if not await verify_password(
-                    user.password, existing_user_by_email.password_hash
-                ):
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid password. Please use the correct password for this email.",
-                    )
-                # Update existing user to add patient account
-                updated_user = await crud.update_user_patient_status(
-                    existing_user_by_email.id, True, session
-                )
-                if not updated_user:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="Failed to create patient account",
-                    )
-                # Return the updated user
-                return ReadUser(
-                    id=updated_user.id,
-                    first_name=updated_user.first_name,
-                    last_name=updated_user.last_name,
-                    email=updated_user.email,
-                    phone=updated_user.phone,
-                    role=None,
-                    is_patient=True,
-                    accepted_terms=updated_user.accepted_terms,
-                    created_at=updated_user.created_at,
-                    updated_at=updated_user.updated_at,
-                )
-        else:
-            # Trying to create service provider account
-            if existing_role_value:
-                # Already has a service provider role - cannot change
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already in use! Please sign in",
-                )
-            else:
-                # Email exists as patient only - can add service provider role via signup
-                # Verify password matches
-                if not await verify_password(
-                    user.password, existing_user_by_email.password_hash
-                ):
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid password. Please use the correct password for this email.",
-                    )
-                # Update existing user to add service provider role
-                # Import UserRoleEnum for proper enum assignment
-                from db.models.user_model import UserRoleEnum
-
-                if service_provider_role == "doctor":
-                    existing_user_by_email.role = UserRoleEnum.doctor
-                elif service_provider_role == "pharmacist":
-                    existing_user_by_email.role = UserRoleEnum.pharmacist
-                elif service_provider_role == "insurer":
-                    existing_user_by_email.role = UserRoleEnum.insurer
-                # Keep existing patient status (is_patient=True) - user can have both
-                existing_user_by_email.is_patient = existing_is_patient
-                await session.commit()
-                await session.refresh(existing_user_by_email)
-                # Return the updated user
-                return ReadUser(
-                    id=existing_user_by_email.id,
-                    first_name=existing_user_by_email.first_name,
-                    last_name=existing_user_by_email.last_name,
-                    email=existing_user_by_email.email,
-                    phone=existing_user_by_email.phone,
-                    role=service_provider_role,
-                    is_patient=existing_user_by_email.is_patient,
-                    accepted_terms=existing_user_by_email.accepted_terms,
-                    created_at=existing_user_by_email.created_at,
-                    updated_at=existing_user_by_email.updated_at,
-                )
-
     # Prepare user data for creation
-    hashed = await hash_password(user.password)
-    user_data_dict = user.model_dump(exclude={"password"})
+    user_data_dict = user.model_dump(exclude=_EXCLUDE_PASSWORD)
 
     # Set is_patient and role based on account type
     if is_patient_account:
@@ -167,178 +175,262 @@ async def create_user(user: CreateUser, session: AsyncSession = Depends(get_sess
         user_data_dict["is_patient"] = False
         user_data_dict["role"] = service_provider_role
 
-    return await crud.create_user(user_data_dict, hashed, session)
+    existing_user_by_email = await crud.check_user_by_email(user.email, session)
+    if not existing_user_by_email:
+        # New email: hash only now that an INSERT will happen; a single
+        # INSERT ... ON CONFLICT DO NOTHING creates the user
+        hashed = await hash_password(user.password)
+        created_user = await crud.create_user_if_absent(user_data_dict, hashed, session)
+        if created_user:
+            return created_user
+        # A concurrent signup took the email first; treat it as an existing account
+        existing_user_by_email = await crud.check_user_by_email(user.email, session)
+        if not existing_user_by_email:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Signup conflicted with a concurrent change, please retry",
+            )
+
+    # Email already exists (phone number is not unique - can be used for multiple accounts).
+    # Check the complementary role can be added and the password matches before
+    # taking the row lock, so the KDF never runs while the lock is held
+    _check_signup_role_addable(existing_user_by_email, is_patient_account)
+    verified_hash = existing_user_by_email.password_hash
+    if not await verify_password(user.password, verified_hash):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid password. Please use the correct password for this email.",
+        )
+
+    # Lock the row so concurrent signups for this email can't both add a role; the
+    # lock is released by the commit below or the rollback when a check fails.
+    # Re-check under the lock in case the account changed since it was read.
+    existing_user_by_email = await crud.get_user_by_email_for_update(
+        user.email, session
+    )
+    if (
+        not existing_user_by_email
+        or existing_user_by_email.password_hash != verified_hash
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Signup conflicted with a concurrent change, please retry",
+        )
+    _check_signup_role_addable(existing_user_by_email, is_patient_account)
+    existing_is_patient = existing_user_by_email.is_patient
+
+    if is_patient_account:
+        # Email exists as service provider - add patient account via signup
+        updated_user = await crud.update_user_patient_status(
+            existing_user_by_email.id, True, session
+        )
+        if not updated_user:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create patient account",
+            )
+        # Return the updated user (fields come straight from the ORM row, so
+        # skip re-validation)
+        return ReadUser.model_construct(
+            id=updated_user.id,
+            first_name=updated_user.first_name,
+            last_name=updated_user.last_name,
+            email=updated_user.email,
+            phone=updated_user.phone,
+            role=None,
+            is_patient=True,
+            accepted_terms=updated_user.accepted_terms,
+            created_at=updated_user.created_at,
+            updated_at=updated_user.updated_at,
+        )
+
+    # Email exists as patient only - add service provider role via signup
+    role_enum = _ROLE_MAP.get(service_provider_role)
+    if role_enum is not None:
+        existing_user_by_email.role = role_enum
+    # Keep existing patient status (is_patient=True) - user can have both
+    existing_user_by_email.is_patient = existing_is_patient
+    # users.updated_at has no ON UPDATE; stamp it here so the response
+    # needs no refresh SELECT
+    existing_user_by_email.updated_at = datetime.now(timezone.utc)
+    await session.commit()
+    # Return the updated user (fields come straight from the ORM row, so
+    # skip re-validation)
+    return ReadUser.model_construct(
+        id=existing_user_by_email.id,
+        first_name=existing_user_by_email.first_name,
+        last_name=existing_user_by_email.last_name,
+        email=existing_user_by_email.email,
+        phone=existing_user_by_email.phone,
+        role=service_provider_role,
+        is_patient=existing_user_by_email.is_patient,
+        accepted_terms=existing_user_by_email.accepted_terms,
+        created_at=existing_user_by_email.created_at,
+        updated_at=existing_user_by_email.updated_at,
+    )
+
+
+# Append an auth Set-Cookie header directly, skipping Starlette's per-call cookie builder.
+# Token values are URL-safe base64/JWT strings, so they never need quoting.
+def _set_auth_cookie(
+    response: Response,
+    key: str,
+    value: str,
+    max_age: Optional[int] = None,
+    expires: Optional[datetime] = None,
+):
+    header = f"{key}={value}{_COOKIE_ATTRS}"
+    if max_age is not None:
+        header += f"; Max-Age={max_age}"
+    if expires is not None:
+        header += f"; expires={format_datetime(expires, usegmt=True)}"
+    response.raw_headers.append((b"set-cookie", header.encode("latin-1")))
+
+
+# Set the short-lived access token and long-lived refresh token cookies
+def _set_auth_cookies(
+    response: Response, access_token: str, refresh_token: str, refresh_exp: datetime
+):
+    _set_auth_cookie(
+        response, "access_token", access_token, max_age=ACCESS_TOKEN_MAX_AGE
+    )
+    _set_auth_cookie(response, "refresh_token", refresh_token, expires=refresh_exp)
+
+
+def _login_action(
+    selected_role: Optional[str], is_patient: bool, role_value: Optional[str]
+) -> str:
+    """Look up the login action for the selected role and the account's roles."""
+    if selected_role == "patient":
+        selected_kind = "patient"
+    elif selected_role in _SERVICE_PROVIDER_ROLES:
+        selected_kind = "provider"
+    else:
+        selected_kind = None
+    if not role_value:
+        role_match = "none"
+    elif role_value == selected_role:
+        role_match = "same"
+    else:
+        role_match = "other"
+    return _LOGIN_ACTIONS.get((selected_kind, is_patient, role_match), "login_default")
 
 
 @router.post("/login")
 async def user_login(
-    user: UserLogin, response: Response, session: AsyncSession = Depends(get_session)
+    user: UserLogin,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
 ):
     # Get the selected role from login request (normalized to lowercase)
     selected_role = user.role.lower() if user.role else None
 
     # Verify user credentials - find user by email or phone
     validated_user = await crud.login_user(user, session)
-    if not validated_user or not await verify_password(
-        user.password, validated_user.password_hash
-    ):
+    # Always run exactly one hash check, even for unknown accounts
+    password_ok = await verify_password(
+        user.password, validated_user.password_hash if validated_user else None
+    )
+    if not validated_user or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
 
+    # Transparently upgrade legacy bcrypt hashes to Argon2id on successful login
+    if password_needs_rehash(validated_user.password_hash):
+        await crud.update_password_hash(
+            validated_user.id, await hash_password(user.password), session
+        )
+
     # Check if user is a patient account
     is_existing_patient = validated_user.is_patient
-    existing_role = validated_user.role
-    # Convert role enum to string value (e.g., UserRoleEnum.doctor -> "doctor")
-    existing_role_value = (
-        existing_role.value
-        if existing_role and hasattr(existing_role, "value")
-        else str(existing_role) if existing_role else None
-    )
-    # Convert role to capitalized string for display (e.g., "doctor" -> "Doctor")
-    existing_role_str = (
-        existing_role_value.capitalize() if existing_role_value else None
-    )
-
-    # Determine role for token based on selected role and existing account
-    role_for_token = None
+    # Role as a plain string (e.g., UserRoleEnum.doctor -> "doctor")
+    existing_role_value = validated_user.role_str
+    # Role for display (e.g., "doctor" -> "Doctor")
+    existing_role_str = _ROLE_DISPLAY.get(existing_role_value)
+
+    # Resolve the login via the decision table (see _LOGIN_ACTIONS)
+    action = _login_action(selected_role, is_existing_patient, existing_role_value)
+
+    if action == "prompt_service_provider_to_patient":
+        # User selected patient but only has service provider account
+        # Return special response with two options
+        return {
+            "msg": f"Email already registered as {existing_role_str}",
+            "requires_action": True,
+            "action_type": "service_provider_to_patient",
+            "options": {
+                "option1": {
+                    "action": "continue_with_service_provider",
+                    "label": f"Continue as a {existing_role_str}",
+                    "role": existing_role_value,
+                },
+                "option2": {
+                    "action": "create_patient_account",
+                    "label": "Create patient account",
+                },
+            },
+            "user": {
+                "id": validated_user.id,
+                "email": validated_user.email,
+                "is_patient": False,
+                "role": existing_role_value,
+            },
+        }
+    if action == "prompt_patient_to_service_provider":
+        # Email exists as patient only - show options
+        return {
+            "msg": "Email already registered as patient",
+            "requires_action": True,
+            "action_type": "patient_to_service_provider",
+            "options": {
+                "option1": {
+                    "action": "go_to_patient_dashboard",
+                    "label": "Go to patient dashboard",
+                },
+                "option2": {
+                    "action": "create_service_provider_account",
+                    "label": f"Create {selected_role} account",
+                    "role": selected_role,
+                },
+            },
+            "user": {
+                "id": validated_user.id,
+                "email": validated_user.email,
+                "is_patient": True,
+                "role": None,
+            },
+        }
+    if action == "role_conflict":
+        # User selected different service provider role - error
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Email already registered with {existing_role_str} role",
+        )
 
-    # Handle role logic based on existing account and selected role
-    if selected_role == "patient":
-        # User selected patient role
-        if is_existing_patient:
-            # User has patient account - login as patient
-            role_for_token = "patient"
-        else:
-            # User selected patient but only has service provider account
-            # Return special response with two options
-            return Response(
-                status_code=status.HTTP_200_OK,
-                content=json.dumps(
-                    {
-                        "msg": f"Email already registered as {existing_role_str}",
-                        "requires_action": True,
-                        "action_type": "service_provider_to_patient",
-                        "options": {
-                            "option1": {
-                                "action": "continue_with_service_provider",
-                                "label": f"Continue as a {existing_role_str}",
-                                "role": existing_role_value,
-                            },
-                            "option2": {
-                                "action": "create_patient_account",
-                                "label": "Create patient account",
-                            },
-                        },
-                        "user": {
-                            "id": validated_user.id,
-                            "email": validated_user.email,
-                            "is_patient": False,
-                            "role": existing_role_value,
-                        },
-                    }
-                ),
-                media_type="application/json",
-            )
-    elif selected_role in ["doctor", "pharmacist", "insurer"]:
-        # User selected a service provider role
-        if existing_role_value:
-            # User has a service provider role
-            if selected_role == existing_role_value:
-                # User selected matching service provider role - login as that role
-                role_for_token = selected_role
-            else:
-                # User selected different service provider role - error
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Email already registered with {existing_role_str} role",
-                )
-        else:
-            # User doesn't have service provider role (only patient or new)
-            if is_existing_patient:
-                # Email exists as patient only - show options
-                return Response(
-                    status_code=status.HTTP_200_OK,
-                    content=json.dumps(
-                        {
-                            "msg": "Email already registered as patient",
-                            "requires_action": True,
-                            "action_type": "patient_to_service_provider",
-                            "options": {
-                                "option1": {
-                                    "action": "go_to_patient_dashboard",
-                                    "label": "Go to patient dashboard",
-                                },
-                                "option2": {
-                                    "action": "create_service_provider_account",
-                                    "label": f"Create {selected_role} account",
-                                    "role": selected_role,
-                                },
-                            },
-                            "user": {
-                                "id": validated_user.id,
-                                "email": validated_user.email,
-                                "is_patient": True,
-                                "role": None,
-                            },
-                        }
-                    ),
-                    media_type="application/json",
-                )
-            else:
-                # This shouldn't happen - user exists but no role and not patient
-                role_for_token = selected_role
+    if action == "login_patient":
+        role_for_token = "patient"
+    elif action == "login_selected_role":
+        role_for_token = selected_role
     else:
         # No role selected - default to patient if they have patient account
         role_for_token = (
             "patient" if is_existing_patient else (existing_role_value or "patient")
         )
 
-    # Ensure role_for_token is set
-    if not role_for_token:
-        role_for_token = (
-            "patient" if is_existing_patient else (existing_role_value or "patient")
-        )
-
     # 2FA DISABLED: Create tokens directly after password verification
     # create tokens
     access_token, refresh_token, refresh_exp = await create_tokens(
         validated_user.id, role_for_token
     )
-    # hash refresh_token
-    hashed_refresh_token = await hash_password(refresh_token)
-    # store session in db
+    # HMAC the refresh token so it can be looked up by equality
+    hashed_refresh_token = hash_refresh_token(refresh_token)
+    # store session in db before the refresh cookie goes out
     await crud.create_session(
         validated_user.id, hashed_refresh_token, refresh_exp, session
     )
 
-    # Cookie settings based on environment
-    # Production: secure=True, samesite="none" for cross-domain (Vercel -> Railway)
-    # Development: secure=False, samesite="Lax" for localhost
-    cookie_secure = config.is_production
-    cookie_samesite = "none" if config.is_production else "Lax"
-
-    # Access Token (short-lived)
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        secure=cookie_secure,
-        samesite=cookie_samesite,
-        path="/",  # Set path to root so it works with rewrites
-        max_age=ACCESS_TOKEN_MAX_AGE,
-    )
-
-    # Refresh Token (long-lived)
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=True,
-        secure=cookie_secure,
-        samesite=cookie_samesite,
-        path="/",  # Set path to root so it works with rewrites
-        expires=refresh_exp,  # Uses the calculated datetime for long expiry
-    )
+    _set_auth_cookies(response, access_token, refresh_token, refresh_exp)
 
     # Return user data in response to avoid immediate getCurrentUser call
     # Note: Cookies are already set on the response parameter, so return a dict
@@ -368,9 +460,11 @@ async def create_patient_account(
     """Create patient account for existing service provider email"""
     # Verify user credentials first
     validated_user = await crud.login_user(user_login, session)
-    if not validated_user or not await verify_password(
-        user_login.password, validated_user.password_hash
-    ):
+    # Always run exactly one hash check, even for unknown accounts
+    password_ok = await verify_password(
+        user_login.password, validated_user.password_hash if validated_user else None
+    )
+    if not validated_user or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
@@ -395,56 +489,29 @@ async def create_patient_account(
     access_token, refresh_token, refresh_exp = await create_tokens(
         validated_user.id, role_for_token
     )
-    hashed_refresh_token = await hash_password(refresh_token)
+    hashed_refresh_token = hash_refresh_token(refresh_token)
     await crud.create_session(
         validated_user.id, hashed_refresh_token, refresh_exp, session
     )
 
-    # Cookie settings based on environment
-    cookie_secure = config.is_production
-    cookie_samesite = "none" if config.is_production else "Lax"
-
     # Set cookies
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        secure=cookie_secure,
-        samesite=cookie_samesite,
-        path="/",
-        max_age=ACCESS_TOKEN_MAX_AGE,
-    )
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=True,
-        secure=cookie_secure,
-        samesite=cookie_samesite,
-        path="/",
-        expires=refresh_exp,
-    )
+    _set_auth_cookies(response, access_token, refresh_token, refresh_exp)
 
     # Return user data
-    return Response(
-        status_code=status.HTTP_200_OK,
-        content=json.dumps(
-            {
-                "msg": "Patient account created successfully",
-                "user_id": validated_user.id,
-                "user": {
-                    "id": validated_user.id,
-                    "first_name": validated_user.first_name,
-                    "last_name": validated_user.last_name,
-                    "email": validated_user.email,
-                    "phone": validated_user.phone,
-                    "role": role_for_token,
-                    "is_patient": True,
-                    "accepted_terms": validated_user.accepted_terms,
-                },
-            }
-        ),
-        media_type="application/json",
-    )
+    return {
+        "msg": "Patient account created successfully",
+        "user_id": validated_user.id,
+        "user": {
+            "id": validated_user.id,
+            "first_name": validated_user.first_name,
+            "last_name": validated_user.last_name,
+            "email": validated_user.email,
+            "phone": validated_user.phone,
+            "role": role_for_token,
+            "is_patient": True,
+            "accepted_terms": validated_user.accepted_terms,
+        },
+    }
 
 
 @router.post("/verify-account")
@@ -453,15 +520,14 @@ async def verify_account(
     response: Response,
     session: AsyncSession = Depends(get_session),
 ):
-    is_otp_valid = await crud.verify_otp(
+    # Consume the OTP and fetch the user linked to it in one round trip
+    current_user_data = await crud.verify_otp_and_fetch_user(
         userdata.user_id, userdata.identifier, userdata.otp_code, session
     )
-    if not is_otp_valid:
+    if not current_user_data:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="OTP verification failed"
         )
-    # Fetch User data using the ID linked in the OTP record
-    current_user_data = await crud.current_user(userdata.identifier, session)
 
     # Handle role for token creation (patient accounts have role=None)
     role_for_token = (
@@ -474,38 +540,14 @@ async def verify_account(
     access_token, refresh_token, refresh_exp = await create_tokens(
         current_user_data.id, role_for_token
     )
-    # hash refresh_token
-    hashed_refresh_token = await hash_password(refresh_token)
+    # HMAC the refresh token so it can be looked up by equality
+    hashed_refresh_token = hash_refresh_token(refresh_token)
     # store session in db
     await crud.create_session(
         current_user_data.id, hashed_refresh_token, refresh_exp, session
     )
 
-    # Cookie settings based on environment
-    cookie_secure = config.is_production
-    cookie_samesite = "none" if config.is_production else "Lax"
-
-    # Access Token (short-lived)
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        secure=cookie_secure,
-        samesite=cookie_samesite,
-        path="/",  # Set path to root so it works with rewrites
-        max_age=ACCESS_TOKEN_MAX_AGE,
-    )
-
-    # Refresh Token (long-lived)
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=True,
-        secure=cookie_secure,
-        samesite=cookie_samesite,
-        path="/",  # Set path to root so it works with rewrites
-        expires=refresh_exp,  # Uses the calculated datetime for long expiry
-    )
+    _set_auth_cookies(response, access_token, refresh_token, refresh_exp)
 
     # Return user data in response
     # Return role_for_token for frontend (patient accounts have role=None in DB)
@@ -539,21 +581,20 @@ async def refresh_access_token(
             detail="Refresh token required for renewal.",
         )
 
-    # 2. Get all active sessions and verify the refresh token against each hash
-    # bcrypt produces different hashes each time, so we must use verify_password
-    all_sessions = await crud.get_all_active_sessions(session)
-    db_session = None
-    for sess in all_sessions:
-        if await verify_password(refresh_token, sess.refresh_token_hash):
-            db_session = sess
-            break
+    # 2. Look up the session and its user by the HMAC of the refresh token (unique,
+    # indexed) in one query
+    found = await crud.active_session_with_user(
+        hash_refresh_token(refresh_token), session
+    )
 
-    if not db_session:
+    if not found:
         # Token might be fake or revoked
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid or revoked token.")
+    db_session, user = found
 
     # 4. Check if the session has expired (Server-side expiry check)
-    if db_session.expires_at < datetime.utcnow():
+    # sessions.expires_at is timestamptz, so compare against aware UTC now
+    if db_session.expires_at < datetime.now(timezone.utc):
         # Clean up the expired record
         await crud.delete_session(db_session, session)
         raise HTTPException(
@@ -562,8 +603,7 @@ async def refresh_access_token(
 
     # --- Token Renewal ---
 
-    # 5. Fetch the user associated with the session
-    user = await crud.get_user_by_id(db_session.user_id, session)
+    # 5. The user associated with the session (loaded with it above)
     if not user:
         raise HTTPException(
             status.HTTP_404_NOT_FOUND, "User associated with session not found."
@@ -574,88 +614,45 @@ async def refresh_access_token(
     role_for_token = "patient" if user.is_patient else (user.role or "patient")
     access_token, _, _ = await create_tokens(user.id, role_for_token)
 
-    # Cookie settings based on environment
-    cookie_secure = config.is_production
-    cookie_samesite = "none" if config.is_production else "Lax"
-
     # 7. Set the NEW Access Token in the response cookie (OVERWRITING the expired one)
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        secure=cookie_secure,
-        samesite=cookie_samesite,
-        max_age=ACCESS_TOKEN_MAX_AGE,
+    _set_auth_cookie(
+        response, "access_token", access_token, max_age=ACCESS_TOKEN_MAX_AGE
     )
 
     return {"msg": "Access token refreshed successfully."}
 
 
 @router.get("/me", response_model=ReadUser)
-async def get_me(current_user=Depends(get_current_user)):
+async def get_me(current_user=Depends(get_current_user_fresh)):
     """Get current authenticated user's information."""
     # ReadUser has from_attributes=True, so we can use model_validate
     # But we need to handle the role enum conversion from UserRoleEnum to UserRole
-    from schemas.user_schema import UserRole
-
-    # Convert role if present
-    role_value = None
-    if current_user.role:
-        role_value = (
-            current_user.role.value
-            if hasattr(current_user.role, "value")
-            else str(current_user.role)
-        )
-        try:
-            role_value = UserRole(role_value.lower())
-        except (ValueError, AttributeError):
-            role_value = None
-
-    # Use model_validate with role override
-    try:
-        user_data = ReadUser.model_validate(current_user, from_attributes=True)
-        # Override role if we converted it
-        if role_value is not None:
-            user_data.role = role_value
-        return user_data
-    except Exception as e:
-        # Fallback: manual construction
-        return ReadUser(
-            id=current_user.id,
-            first_name=current_user.first_name,
-            middle_name=current_user.middle_name,
-            last_name=current_user.last_name,
-            email=current_user.email,
-            phone=current_user.phone,
-            emergency_contact=current_user.emergency_contact,
-            role=role_value,
-            is_patient=current_user.is_patient,
-            accepted_terms=current_user.accepted_terms,
-            created_at=current_user.created_at,
-            updated_at=current_user.updated_at,
-        )
-
+    role_value = _READ_ROLES.get(current_user.role_str)
 
-from typing import Optional
+    user_data = ReadUser.model_validate(current_user, from_attributes=True)
+    # Override role if we converted it
+    if role_value is not None:
+        user_data.role = role_value
+    return user_data
 
 
 @router.get("/address", response_model=Optional[AddressRead])
 async def get_my_address(
-    current_user=Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
     session: AsyncSession = Depends(get_session),
 ):
     """
     Return the current user's primary address, if one exists.
     Shared by both doctor and patient account settings pages.
     """
-    address = await address_crud.get_primary_address_for_user(current_user.id, session)
+    address = await address_crud.get_primary_address_for_user(user_id, session)
     return address
 
 
 @router.put("/address", response_model=AddressRead)
 async def upsert_my_address(
     payload: AddressUpdate,
-    current_user=Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
     session: AsyncSession = Depends(get_session),
 ):
     """
@@ -665,8 +662,7 @@ async def upsert_my_address(
     """
     data = payload.model_dump(exclude_unset=True)
 
-    required_fields = ["address_line1", "city"]
-    if any(not data.get(field) for field in required_fields):
+    if not data.get("address_line1") or not data.get("city"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="address_line1 and city are required fields.",
@@ -684,6 +680,6 @@ async def upsert_my_address(
         del data["raw_geocoding_payload"]
 
     address = await address_crud.upsert_primary_address_for_user(
-        current_user.id, data, session
+        user_id, data, session
     )
     return address
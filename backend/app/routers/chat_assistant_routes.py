@@ -1,13 +1,13 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import StreamingResponse
-from openai import AsyncOpenAI
+from app.services.assistant_rag.openai_client import client
 from app.db import get_session
-from app.db import auth_crud, assistant_crud
+from app.db import assistant_crud
 from app.db.crud import doctor_crud, appointment_request_crud
 from app.services import auth_utils
-from app.core import config
 from app.schemas import ChatRequest
+import asyncio
 import json
 from app.services.assistant_tools import ai_register
 from app.services.assistant_tools.tool_definitions import tools
@@ -24,7 +24,27 @@ from app.services.assistant_tools.prompt import build_system_prompt
 
 
 router = APIRouter()
-client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+
+# Messages that never need a knowledge-base lookup
+NON_KNOWLEDGE_QUERIES = frozenset(
+    {
+        "hi",
+        "hello",
+        "hey",
+        "thanks",
+        "thank you",
+        "ok",
+        "okay",
+        "cool",
+        "yes",
+        "no",
+    }
+)
+
+
+def is_small_talk(text: str) -> bool:
+    normalized = text.strip().lower()
+    return normalized in NON_KNOWLEDGE_QUERIES or len(normalized.split()) <= 2
 
 
 # Tool function registry
@@ -69,43 +89,22 @@ async def chat_stream(
 ):
     question = request.messages[-1].content
 
-    # Always try a RAG lookup; only attach if we actually get context.
-    NON_KNOWLEDGE_QUERIES = [
-        "hi",
-        "hello",
-        "hey",
-        "thanks",
-        "thank you",
-        "ok",
-        "okay",
-        "cool",
-        "yes",
-        "no",
-    ]
-
-    def is_small_talk(text: str) -> bool:
-        return len(text.split()) <= 2 or text.lower().strip() in NON_KNOWLEDGE_QUERIES
-
-    use_rag = False
-
-    rag_results = {"context": "", "chunks": []}
+    # Always try a RAG lookup (except for small talk); only attach if we get context.
+    async def lookup_rag():
+        if is_small_talk(question):
+            return {"context": "", "chunks": []}
+        return await indexing.cached_query_rag(user_id, question)
 
-    if not is_small_talk(question):
-        rag_results = await indexing.query_rag(user_id, question)
-        use_rag = bool(rag_results.get("context"))
+    # user + recent history come back in one query, overlapping the RAG lookup
+    (user, previous_messages), rag_results = await asyncio.gather(
+        assistant_crud.get_user_with_recent_messages(session, user_id, limit=20),
+        lookup_rag(),
+    )
 
+    use_rag = bool(rag_results.get("context"))
     citations = rag_results.get("chunks") if use_rag else None
     context_for_gpt = rag_results.get("context", "")
 
-    # get current_user
-    # Fetch user by id (current_user expects email)
-    user = await auth_crud.get_user_by_id(user_id, session)
-
-    # previous messages
-    previous_messages = await assistant_crud.get_recent_messages(
-        session, user_id, limit=20
-    )
-
     # convert to OpenAI message format
     past_messages = [{"role": m.role, "content": m.content} for m in previous_messages]
 
@@ -1,4 +1,11 @@
-from .auth_utils import hash_password, verify_password, verify_access_token, create_tokens
+from .auth_utils import (
+    hash_password,
+    verify_password,
+    verify_access_token,
+    create_tokens,
+    hash_refresh_token,
+    password_needs_rehash,
+)
 from .otp_utils import send_otp_email
 from .storage_service import get_storage_service, StorageService
 from .google_calendar import (
@@ -12,6 +19,8 @@ __all__ = [
     verify_password,
     verify_access_token,
     create_tokens,
+    hash_refresh_token,
+    password_needs_rehash,
     send_otp_email,
     get_storage_service,
     StorageService,
@@ -1,14 +1,16 @@
-from app.core import config
-from openai import AsyncOpenAI
+from app.services.assistant_rag.openai_client import client
 import numpy as np
 import faiss
 import os, json
-from datetime import datetime
-from app.services.assistant_rag import rag_utils
+from datetime import datetime, timezone
+from app.services.assistant_rag import rag_utils, semantic_cache
 
 
-client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
 dimensions = 1536  # Dimension for text-embedding-3-small
+EMBED_BATCH_SIZE = 2048  # max inputs per embeddings request
+HNSW_M = 32  # graph neighbours per node
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 40  # search breadth; higher = better recall, slower queries
 DATA_ROOT = "data/users"
 
 
@@ -20,6 +22,26 @@ async def generate_embed(text_chunk: str):
     return np.array(embedding.data[0].embedding, dtype="float32")
 
 
+# Approximate (HNSW) index, still on L2 distance so query thresholds keep their meaning.
+# Vectors are stored as float16: half the bytes per distance computation, and unlike
+# int8 it needs no training, which small per-user indexes can't provide reliably.
+def new_index():
+    index = faiss.IndexHNSWSQ(dimensions, faiss.ScalarQuantizer.QT_fp16, HNSW_M)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+# Move vectors from a legacy index (exact flat, or float32 HNSW) into the current layout
+def upgrade_index(index):
+    if isinstance(index, faiss.IndexHNSWSQ):
+        return index
+    upgraded = new_index()
+    if index.ntotal:
+        upgraded.add(index.reconstruct_n(0, index.ntotal))
+    return upgraded
+
+
 # Load or initialize user index and chunks
 def load_user_index(user_id: str):
     user_dir = os.path.join(DATA_ROOT, str(user_id))
@@ -32,7 +54,9 @@ def load_user_index(user_id: str):
     if os.path.exists(index_path):
         index = faiss.read_index(index_path)
     else:
-        index = faiss.IndexFlatL2(dimensions)
+        index = new_index()
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
 
     if os.path.exists(chunks_path):
         with open(chunks_path) as f:
@@ -49,6 +73,25 @@ def load_user_index(user_id: str):
     return index, stored_chunks, user_dir, stored_files
 
 
+# Find an already indexed file of this user by the hash of its uploaded bytes.
+# Reads only files.json, not the FAISS index or chunks.
+def find_file_by_hash(user_id: int, content_hash: str):
+    files_path = os.path.join(DATA_ROOT, str(user_id), "files.json")
+    if not os.path.exists(files_path):
+        return None
+    with open(files_path) as f:
+        stored_files = json.load(f)
+    return next((f for f in stored_files if f.get("content_hash") == content_hash), None)
+
+
+# Cheap version stamp of a user's knowledge base; changes whenever files.json is saved
+def kb_version(user_id: int) -> int:
+    try:
+        return os.stat(os.path.join(DATA_ROOT, str(user_id), "files.json")).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
 # Save user index and chunks and files
 def save_user_index(index, stored_chunks, user_dir, stored_files):
     faiss.write_index(index, os.path.join(user_dir, "kb.faiss"))
@@ -58,58 +101,96 @@ def save_user_index(index, stored_chunks, user_dir, stored_files):
         json.dump(stored_files, f)
 
 
-# Store document for a user
-async def store_document(user_id: int, text: str, metadata: dict = None):
-    index, stored_chunks, user_dir, stored_files = load_user_index(user_id)
-    chunks = rag_utils.split_text(text)
+# Generate embeddings for many text chunks, one API request per batch
+async def generate_embeds(text_chunks: list[str], batch_size: int = EMBED_BATCH_SIZE):
     vectors = []
+    for start in range(0, len(text_chunks), batch_size):
+        response = await client.embeddings.create(
+            model="text-embedding-3-small",
+            input=text_chunks[start : start + batch_size],
+        )
+        vectors.extend(d.embedding for d in response.data)
+    return np.array(vectors, dtype="float32").reshape(-1, dimensions)
 
-    file_id = metadata["file_id"]
 
-    # Check if file already exists
-    existing_file = next((f for f in stored_files if f["file_id"] == file_id), None)
-
-    if not existing_file:
-        file_data = {
-            "file_id": file_id,
-            "file_name": metadata.get("file_name"),
-            "file_type": metadata.get("file_type"),
-            "uploaded_at": datetime.utcnow().isoformat(),
-            "structured": metadata.get("structured"),
-            "dates": metadata.get("dates"),
-            "num_chunks": 0,
-        }
-        stored_files.append(file_data)
-    else:
-        file_data = existing_file
-
-    for i, chunk in enumerate(chunks):
-        vec = await generate_embed(chunk)
-        vectors.append(vec)
-
-        chunk_id = f"{file_id}_c{len(stored_chunks)}"
-        chunk_obj = {
-            "text": chunk,
-            "file_id": file_data.get("file_id"),
-            "file_name": file_data.get("file_name"),
-            "chunk_id": chunk_id,
-            "source_id": f"{file_data.get('file_id')}_c{i}",
-            "page_start": metadata.get("page_start"),
-            "page_end": metadata.get("page_end"),
-        }
-
-        stored_chunks.append(chunk_obj)
+# Store several sections of a document for a user, embedding all their chunks together
+async def store_documents_bulk(user_id: int, texts: list[str], metadatas: list[dict]):
+    index, stored_chunks, user_dir, stored_files = load_user_index(user_id)
+    # indexes written in an older layout are converted the next time the KB changes
+    index = upgrade_index(index)
+    all_chunks = []
+
+    for text, metadata in zip(texts, metadatas):
+        chunks = rag_utils.split_text(text)
+        file_id = metadata["file_id"]
+
+        # Check if file already exists
+        existing_file = next((f for f in stored_files if f["file_id"] == file_id), None)
+
+        if not existing_file:
+            file_data = {
+                "file_id": file_id,
+                "file_name": metadata.get("file_name"),
+                "file_type": metadata.get("file_type"),
+                "uploaded_at": datetime.now(timezone.utc).isoformat(),
+                "structured": metadata.get("structured"),
+                "dates": metadata.get("dates"),
+                "content_hash": metadata.get("content_hash"),
+                "num_chunks": 0,
+            }
+            stored_files.append(file_data)
+        else:
+            file_data = existing_file
+
+        for i, chunk in enumerate(chunks):
+            chunk_id = f"{file_id}_c{len(stored_chunks)}"
+            chunk_obj = {
+                "text": chunk,
+                "file_id": file_data.get("file_id"),
+                "file_name": file_data.get("file_name"),
+                "chunk_id": chunk_id,
+                "source_id": f"{file_data.get('file_id')}_c{i}",
+                "page_start": metadata.get("page_start"),
+                "page_end": metadata.get("page_end"),
+            }
+
+            stored_chunks.append(chunk_obj)
+            all_chunks.append(chunk)
+
+        file_data["num_chunks"] += len(chunks)
+
+    if all_chunks:
+        index.add(await generate_embeds(all_chunks))
 
-    vectors = np.array(vectors, dtype="float32")
-    index.add(vectors)
+    save_user_index(index, stored_chunks, user_dir, stored_files)
+    # cached answers may now miss the new document
+    semantic_cache.invalidate(user_id)
 
-    file_data["num_chunks"] += len(chunks)
 
-    save_user_index(index, stored_chunks, user_dir, stored_files)
+# Store document for a user
+async def store_document(user_id: int, text: str, metadata: dict = None):
+    await store_documents_bulk(user_id, [text], [metadata])
 
 
 # Query RAG for a user
-async def query_rag(user_id: int, question: str):
+# query_rag behind the per-user caches: repeated questions skip the embedding call
+# entirely, paraphrases skip the index search
+async def cached_query_rag(user_id: int, question: str):
+    version = kb_version(user_id)
+    result = semantic_cache.get_exact(user_id, version, question)
+    if result is not None:
+        return result
+
+    q_emb = await generate_embed(question)
+    result = semantic_cache.get(user_id, version, q_emb)
+    if result is None:
+        result = await query_rag(user_id, question, q_vec=q_emb)
+        semantic_cache.put(user_id, version, q_emb, result)
+    semantic_cache.put_exact(user_id, version, question, result)
+    return result
+
+
+async def query_rag(user_id: int, question: str, q_vec: np.ndarray = None):
     print("Querying RAG for user:", user_id, "Question:", question)
     index, stored_chunks, _, stored_files = load_user_index(user_id)
     if not stored_chunks:
@@ -141,7 +222,8 @@ async def query_rag(user_id: int, question: str):
             "structured": matched_test,
         }
 
-    q_vec = await generate_embed(question)
+    if q_vec is None:
+        q_vec = await generate_embed(question)
     q_vec = np.array([q_vec], dtype="float32")
 
     distances, ids = index.search(q_vec, k=3)
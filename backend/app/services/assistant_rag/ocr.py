@@ -1,8 +1,7 @@
-from app.core.config import config
-from openai import AsyncOpenAI, OpenAIError
+from openai import OpenAIError
+from app.services.assistant_rag.openai_client import client
 import base64
 
-client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
 
 
 # 1. Convert raw bytes to Base64 string
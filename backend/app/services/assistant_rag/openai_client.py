@@ -0,0 +1,13 @@
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from app.core import config
+
+# One OpenAI client (and so one HTTP connection pool) shared by the RAG and assistant
+# modules, so concurrent embedding / chat requests reuse warm keep-alive connections
+# instead of each module paying its own TCP + TLS setup.
+client = AsyncOpenAI(
+    api_key=config.OPENAI_API_KEY,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+    ),
+)
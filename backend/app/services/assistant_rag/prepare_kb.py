@@ -1,3 +1,4 @@
+import asyncio
 from typing import Set
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session, auth_crud
@@ -72,7 +73,7 @@ from app.db import auth_crud
 
 #         if file_type == "pdf":
 #             # For PDFs: split into sections (uses raw page list) and index each section
-#             pages = rag_utils.extract_text_from_pdf(file_bytes)
+#             pages = await asyncio.to_thread(rag_utils.extract_text_from_pdf, file_bytes)
 #             sections = await rag_utils.split_into_sections(pages)
 
 #             for section in sections:
@@ -113,18 +114,21 @@ async def prepare_user_kb(user_id: int, session: AsyncSession = Depends(get_sess
     print("Preparing KB for user:", user_id)
 
     # Fetch user and accessible files. If role not set, treat as patient for now.
-    user = await auth_crud.get_user_by_id(user_id, session)
-    print("User role:", user.role)
-
-    role = (user.role or "").lower() if hasattr(user, "role") else ""
-    if role == "doctor":
-        files = await fetch_doctor_accessible_files(session, user_id)
-    elif role in ("patient", ""):
-        # treat null/empty role as patient
-        files = await fetch_patient_accessible_files(session, user_id)
-    else:
-        # no accessible files for other roles yet
-        files = []
+    # These are the only DB reads; the short transaction hands the connection back to
+    # the pool before the minutes-long download/LLM/embedding work below.
+    async with session.begin():
+        user = await auth_crud.get_user_by_id(user_id, session)
+        print("User role:", user.role)
+
+        role = (user.role or "").lower() if hasattr(user, "role") else ""
+        if role == "doctor":
+            files = await fetch_doctor_accessible_files(session, user_id)
+        elif role in ("patient", ""):
+            # treat null/empty role as patient
+            files = await fetch_patient_accessible_files(session, user_id)
+        else:
+            # no accessible files for other roles yet
+            files = []
 
     print("FILES FOUND:", len(files))
 
@@ -179,11 +183,11 @@ async def prepare_user_kb(user_id: int, session: AsyncSession = Depends(get_sess
 
         # PDF?
         if file_type == "pdf":
-            pages = rag_utils.extract_text_from_pdf(file_bytes)
+            pages = await asyncio.to_thread(rag_utils.extract_text_from_pdf, file_bytes)
             sections = await rag_utils.split_into_sections(pages)
 
-            for section in sections:
-                metadata = {
+            metadatas = [
+                {
                     "file_id": file_id,
                     "file_name": file_name,
                     "file_type": "pdf",
@@ -193,9 +197,13 @@ async def prepare_user_kb(user_id: int, session: AsyncSession = Depends(get_sess
                     "structured": structured,
                     "dates": doc_dates,
                 }
+                for section in sections
+            ]
 
-                print("Indexing section:", section["section_name"])
-                await indexing.store_document(user_id, section["text"], metadata)
+            print("Indexing sections:", [s["section_name"] for s in sections])
+            await indexing.store_documents_bulk(
+                user_id, [section["text"] for section in sections], metadatas
+            )
 
         else:
             metadata = {
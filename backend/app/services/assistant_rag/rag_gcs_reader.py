@@ -1,3 +1,4 @@
+import asyncio
 from app.services.storage_service import get_storage_service
 from app.services.assistant_rag import rag_utils, ocr
 
@@ -9,7 +10,7 @@ async def extract_text_from_file(file_bytes: bytes, file_type: str):
     file_type = file_type.lower()
 
     if file_type == "pdf":
-        pages = rag_utils.extract_text_from_pdf(file_bytes)
+        pages = await asyncio.to_thread(rag_utils.extract_text_from_pdf, file_bytes)
         return "\n".join(pages)
 
     if file_type in ["png", "jpg", "jpeg"]:
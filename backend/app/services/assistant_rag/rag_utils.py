@@ -1,11 +1,13 @@
 import io
+import hashlib
 import pdfplumber
 import re
 import os, json
-from openai import AsyncOpenAI
-from app.core import config
+from app.services.assistant_rag.openai_client import client
+from app.services.redis_service import get_cache, set_cache
 
-client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+STRUCTURED_MODEL = "gpt-4o"
+STRUCTURED_CACHE_TTL = 7 * 24 * 60 * 60  # extraction is a pure function of the text
 
 
 # Split PDF pages into sections using LLM
@@ -62,10 +64,17 @@ async def split_into_sections(pages: list[str]):
     return json.loads(response.choices[0].message.content)["sections"]
 
 
-# extract structured data from text
+# extract structured data from text; results are cached in Redis by text hash + model,
+# so re-uploading the same report skips the LLM
 async def extract_structured_data(text: str) -> dict:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    cache_key = f"rag:structured:{STRUCTURED_MODEL}:{digest}"
+    cached = await get_cache(cache_key)
+    if cached is not None:
+        return json.loads(cached)
+
     response = await client.chat.completions.create(
-        model="gpt-4o",  # high accuracy needed
+        model=STRUCTURED_MODEL,  # high accuracy needed
         messages=[
             {
                 "role": "system",
@@ -94,22 +103,30 @@ async def extract_structured_data(text: str) -> dict:
         response_format={"type": "json_object"},  # forces JSON mode
     )
 
-    return json.loads(response.choices[0].message.content)
+    content = response.choices[0].message.content
+    structured = json.loads(content)
+    await set_cache(cache_key, content, ttl=STRUCTURED_CACHE_TTL)
+    return structured
 
 
-# Extract dates from text
-def extract_dates(text: str):
-    patterns = [
+# Date formats, compiled once; order matters since callers use the first date found
+_DATE_PATTERNS = [
+    re.compile(p, re.ASCII)
+    for p in (
         r"\d{4}-\d{2}-\d{2}",  # 2024-04-03
         r"\d{2}/\d{2}/\d{4}",  # 03/04/2024
         r"\d{2}-\d{2}-\d{4}",  # 03-04-2024
         r"\b[A-Za-z]+\s\d{1,2},\s\d{4}",  # April 3, 2024
         r"\b\d{1,2}/\d{1,2}/\d{4}\b",  # 3/4/2024
-    ]
+    )
+]
 
+
+# Extract dates from text
+def extract_dates(text: str):
     dates = []
-    for p in patterns:
-        dates.extend(re.findall(p, text))
+    for p in _DATE_PATTERNS:
+        dates.extend(p.findall(text))
 
     return dates if dates else None
 
@@ -142,11 +159,15 @@ def extract_tests_for_chunk(chunk_text: str, structured_doc: dict):
     return tests
 
 
-# extract text page by page list[str]
-def extract_text_from_pdf(pdf_bytes):
+# extract text page by page list[str]; accepts raw bytes, a file path or a binary
+# file object. Parsing is CPU-bound and blocking, so async callers run it via
+# asyncio.to_thread
+def extract_text_from_pdf(pdf):
     pages = []
-    # io.BytesIO treats raw bytes as a file-like object.. creates in-memory object around it
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+    # io.BytesIO treats raw bytes as a file-like object.. creates in-memory object around it;
+    # paths and file objects go to pdfplumber as they are
+    source = io.BytesIO(pdf) if isinstance(pdf, (bytes, bytearray)) else pdf
+    with pdfplumber.open(source) as pdf:
         for page in pdf.pages:
             pages.append(page.extract_text() or "")
     return pages
@@ -0,0 +1,97 @@
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from cachetools import LRUCache, TTLCache
+
+SIMILARITY_THRESHOLD = 0.95  # cosine similarity needed to reuse a cached result
+TTL_SECONDS = 15 * 60
+MAX_ENTRIES_PER_USER = 256
+MAX_USERS = 1024  # least recently used users' caches are dropped beyond this
+
+
+# Per-user cache of question embeddings (unit-normalised rows) and their RAG results,
+# valid for one version of the user's knowledge base (indexing.kb_version)
+class _UserCache:
+    def __init__(self, dim: int, version: int):
+        self.version = version
+        self.vectors = np.empty((0, dim), dtype="float32")
+        self.entries: List[Tuple[dict, float]] = []  # (result, expires_at)
+
+    def prune(self, now: float):
+        keep = [i for i, (_, expires_at) in enumerate(self.entries) if expires_at > now]
+        keep = keep[-MAX_ENTRIES_PER_USER:]
+        if len(keep) != len(self.entries):
+            self.vectors = self.vectors[keep]
+            self.entries = [self.entries[i] for i in keep]
+
+
+# Keyed by user id; an entry built against an older kb_version is treated as empty, so
+# an upload handled by another worker process still invalidates this one's answers
+_caches: LRUCache = LRUCache(maxsize=MAX_USERS)
+# Exact tier: user id -> (kb_version, normalised question text -> result), checked
+# before embedding anything; bounded and versioned the same way as _caches
+_exact: LRUCache = LRUCache(maxsize=MAX_USERS)
+
+
+def _normalise(q_emb: np.ndarray) -> np.ndarray:
+    vec = np.asarray(q_emb, dtype="float32").ravel()
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+# Return a cached result for a near-duplicate question, or None
+def get(user_id: int, version: int, q_emb: np.ndarray) -> Optional[dict]:
+    cache = _caches.get(user_id)
+    if cache is None or cache.version != version or not cache.entries:
+        return None
+
+    sims = cache.vectors @ _normalise(q_emb)
+    best = int(np.argmax(sims))
+    result, expires_at = cache.entries[best]
+    if sims[best] >= SIMILARITY_THRESHOLD and expires_at > time.monotonic():
+        return result
+    return None
+
+
+def _question_key(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+# Return the cached result for the same question text (case/whitespace-insensitive)
+def get_exact(user_id: int, version: int, question: str) -> Optional[dict]:
+    cached = _exact.get(user_id)
+    if cached is None or cached[0] != version:
+        return None
+    return cached[1].get(_question_key(question))
+
+
+# Remember the result for this exact question text
+def put_exact(user_id: int, version: int, question: str, result: dict):
+    cached = _exact.get(user_id)
+    if cached is None or cached[0] != version:
+        cached = _exact[user_id] = (
+            version,
+            TTLCache(maxsize=MAX_ENTRIES_PER_USER, ttl=TTL_SECONDS),
+        )
+    cached[1][_question_key(question)] = result
+
+
+# Remember the result for this question embedding
+def put(user_id: int, version: int, q_emb: np.ndarray, result: dict):
+    vec = _normalise(q_emb)
+    cache = _caches.get(user_id)
+    if cache is None or cache.version != version:
+        cache = _caches[user_id] = _UserCache(vec.shape[0], version)
+
+    now = time.monotonic()
+    cache.vectors = np.vstack([cache.vectors, vec])
+    cache.entries.append((result, now + TTL_SECONDS))
+    cache.prune(now)
+
+
+# Drop a user's cached results right away in this process, e.g. after their knowledge
+# base changes; other processes notice through the kb_version check
+def invalidate(user_id: int):
+    _caches.pop(user_id, None)
+    _exact.pop(user_id, None)
@@ -1,9 +1,20 @@
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
-from passlib.hash import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+import bcrypt
 import secrets
 import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Mapping, Optional
+import base64
 import hashlib
+import hmac
+import orjson
+import time
+from cachetools import TTLCache
 from core import config
 from fastapi import HTTPException, status, Cookie
 
@@ -12,44 +23,152 @@ ALGORITHM = config.JWT_ALGORITHM
 ACCESS_EXPIRE_MIN = config.ACCESS_TOKEN_EXPIRE_MIN
 REFRESH_EXPIRE_DAYS = config.REFRESH_TOKEN_EXPIRE_DAYS
 
+# Verified access-token claims keyed by the token's SHA-256 digest (the bearer token
+# itself is never held), so repeat requests skip the signature check. Entries are
+# read-only views shared between requests and never outlive the token: the TTL
+# matches the access-token lifetime and each hit re-checks the payload's own exp.
+_verified_tokens: TTLCache = TTLCache(maxsize=10_000, ttl=ACCESS_EXPIRE_MIN * 60)
+
 
 # Password Hashing
 
+# Argon2id with OWASP's 19 MiB / t=2 / p=1 profile, which keeps concurrent logins
+# from ballooning worker memory. Passwords hashed before the switch are bcrypt (or
+# older Argon2 parameters) and still verify; login rehashes them via check_needs_rehash.
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19 * 1024, parallelism=1)
+# Verified against when no user matches, to flatten login timing
+_DUMMY_HASH = _password_hasher.hash(secrets.token_urlsafe(16))
 
-async def hash_password(password: str) -> str:
-    """Hash password asynchronously using bcrypt."""
+
+def _bcrypt_prehash(password: str) -> str:
     # Pre-hash long passwords to avoid bcrypt 72-byte limit
     if len(password.encode("utf-8")) > 72:
         password = hashlib.sha256(password.encode("utf-8")).hexdigest()
+    return password
 
-    # bcrypt is CPU-bound, so run in thread pool
-    return await asyncio.to_thread(bcrypt.hash, password)
 
+def _bcrypt_verify(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(
+            _bcrypt_prehash(password).encode("utf-8"), hashed.encode("utf-8")
+        )
+    except ValueError:
+        # malformed / unknown hash format
+        return False
 
-async def verify_password(password: str, hashed: str) -> bool:
-    """Verify password asynchronously."""
 
-    if len(password.encode("utf-8")) > 72:
-        password = hashlib.sha256(password.encode("utf-8")).hexdigest()
+def _argon2_verify(password: str, hashed: str) -> bool:
+    try:
+        return _password_hasher.verify(hashed, password)
+    except (VerificationError, InvalidHashError):
+        # VerificationError covers mismatches (VerifyMismatchError) and corrupt hashes
+        return False
+
+
+# Password KDFs are CPU-bound and release the GIL. They get their own pool, sized to the
+# cores, so a login burst runs hashes in parallel without oversubscribing the CPU
+# or starving the default executor used by other to_thread work.
+_kdf_executor = ThreadPoolExecutor(
+    max_workers=min(os.cpu_count() or 1, 8), thread_name_prefix="kdf"
+)
+
+
+async def _run_kdf(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_kdf_executor, func, *args)
+
+
+async def hash_password(password: str) -> str:
+    """Hash password asynchronously using Argon2id."""
+    return await _run_kdf(_password_hasher.hash, password)
+
+
+async def verify_password(password: str, hashed: Optional[str]) -> bool:
+    """Verify password asynchronously against an Argon2id or legacy bcrypt hash.
+
+    With no hash (unknown account) a dummy hash is checked and False returned, so
+    a miss costs the same as a wrong password and doesn't reveal which emails exist.
+    """
+    if hashed is None:
+        await _run_kdf(_argon2_verify, password, _DUMMY_HASH)
+        return False
+    if hashed.startswith("$argon2"):
+        return await _run_kdf(_argon2_verify, password, hashed)
 
-    return await asyncio.to_thread(bcrypt.verify, password, hashed)
+    return await _run_kdf(_bcrypt_verify, password, hashed)
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True for legacy bcrypt hashes or Argon2 hashes with outdated parameters."""
+    if not hashed.startswith("$argon2"):
+        return True
+    return _password_hasher.check_needs_rehash(hashed)
 
 
 # Token Creation
 
 
+# JWT Encoding
+
+# HS256 tokens are built and checked directly: the header never changes and the keyed
+# HMAC is copied per token instead of re-deriving the key pads. Output is a standard
+# JWT that jwt.decode also verifies.
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+_HS256_HEADER = _b64url(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+_HS256_MAC = hmac.new(SECRET_KEY.encode(), digestmod=hashlib.sha256)
+
+
+def _encode_hs256(payload: dict) -> str:
+    signing_input = _HS256_HEADER + b"." + _b64url(orjson.dumps(payload))
+    mac = _HS256_MAC.copy()
+    mac.update(signing_input)
+    return (signing_input + b"." + _b64url(mac.digest())).decode("ascii")
+
+
+def _decode_hs256(token: str) -> dict:
+    """Verify an HS256 JWT and return its payload; raises JWTError like jwt.decode."""
+    try:
+        signing_input, signature = token.encode("ascii").rsplit(b".", 1)
+        header, body = signing_input.split(b".")
+    except (UnicodeEncodeError, ValueError):
+        raise JWTError("Malformed token")
+    if header != _HS256_HEADER:
+        # Not our canonical header (e.g. extra fields): let jose handle it
+        return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+
+    mac = _HS256_MAC.copy()
+    mac.update(signing_input)
+    if not hmac.compare_digest(_b64url(mac.digest()), signature):
+        raise JWTError("Signature verification failed")
+
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(body + b"=" * (-len(body) % 4)))
+    except ValueError:
+        raise JWTError("Invalid payload")
+    if not isinstance(payload, dict):
+        raise JWTError("Invalid payload")
+    exp = payload.get("exp")
+    if exp is not None and (not isinstance(exp, (int, float)) or exp < time.time()):
+        raise JWTError("Signature has expired")
+    return payload
+
+
 async def create_tokens(user_id: int, role: str):
     """Create JWT access + random refresh tokens asynchronously."""
+    access_exp = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_EXPIRE_MIN)
     access_payload = {
         "sub": str(user_id),
         "role": role,
-        "exp": datetime.now(timezone.utc) + timedelta(minutes=ACCESS_EXPIRE_MIN),
+        "exp": int(access_exp.timestamp()),
     }
 
-    # JWT encoding is lightweight but let's keep async-friendly style
-    access_token = await asyncio.to_thread(
-        jwt.encode, access_payload, SECRET_KEY, ALGORITHM
-    )
+    # Signing a few hundred bytes costs microseconds; no thread pool hop needed
+    if ALGORITHM == "HS256":
+        access_token = _encode_hs256(access_payload)
+    else:
+        access_token = jwt.encode(access_payload, SECRET_KEY, ALGORITHM)
 
     refresh_token = secrets.token_urlsafe(32)
     refresh_exp = datetime.now(timezone.utc) + timedelta(days=REFRESH_EXPIRE_DAYS)
@@ -57,21 +176,38 @@ async def create_tokens(user_id: int, role: str):
     return access_token, refresh_token, refresh_exp
 
 
+def hash_refresh_token(refresh_token: str) -> str:
+    """Deterministic HMAC-SHA256 of a refresh token, used as its indexed lookup key."""
+    return hmac.new(
+        SECRET_KEY.encode("utf-8"), refresh_token.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+
 # Token Verification
 
 
-async def verify_access_token(token: str) -> dict:
-    """Verify JWT access token and return payload."""
+async def verify_access_token(token: str) -> Mapping:
+    """Verify JWT access token and return its (read-only) payload."""
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = _verified_tokens.get(cache_key)
+    if cached is not None and cached["exp"] > time.time():
+        return cached
     try:
-        payload = await asyncio.to_thread(
-            jwt.decode, token, SECRET_KEY, algorithms=[ALGORITHM]
-        )
+        if ALGORITHM == "HS256":
+            payload = _decode_hs256(token)
+        else:
+            payload = await asyncio.to_thread(
+                jwt.decode, token, SECRET_KEY, algorithms=[ALGORITHM]
+            )
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
             )
+        payload = MappingProxyType(payload)
+        if "exp" in payload:
+            _verified_tokens[cache_key] = payload
         return payload
     except JWTError:
         raise HTTPException(
@@ -81,14 +81,16 @@ async def set_cache(key: str, value: str, ttl: int = 300) -> bool:
         return False
 
 
-async def delete_cache(key: str) -> bool:
-    """Delete key from Redis cache."""
+async def delete_cache(*keys: str) -> bool:
+    """Delete one or more keys from Redis cache in a single round-trip."""
+    if not keys:
+        return True
     try:
         client = await get_redis_client()
-        await client.delete(key)
+        await client.delete(*keys)
         return True
     except Exception as e:
-        logger.error(f"Error deleting cache key {key}: {e}")
+        logger.error(f"Error deleting cache keys {keys}: {e}")
         return False
 
 
@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+# The app imports its packages both top-level ("services", "db") and through the
+# "app." prefix, so both backend/app and backend go on the path, as under uvicorn
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "app"))
+
+# The OpenAI client is built at import time; tests never call it
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,381 @@
+import asyncio
+from datetime import datetime, time, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from db.models import Appointment, User
+from db.models.appointment_request_model import AppointmentRequest, AppointmentRequestStatus
+from routers import appointment_request_routes as routes
+from schemas import AppointmentRequestUpdate
+
+DOCTOR_ID = 10
+PATIENT_ID = 20
+PREFERRED = datetime(2025, 3, 3, tzinfo=timezone.utc)
+SUGGESTED = datetime(2025, 3, 5, tzinfo=timezone.utc)
+
+
+def _request(status, *, appointment=None, is_flexible=True, suggested=False):
+    request = AppointmentRequest(
+        request_id=1,
+        patient_user_id=PATIENT_ID,
+        doctor_user_id=DOCTOR_ID,
+        clinic_id=None,
+        preferred_date=PREFERRED,
+        preferred_time_slot_start=time(9, 0),
+        is_flexible=is_flexible,
+        status=status,
+        reason="checkup",
+        notes=None,
+    )
+    if suggested:
+        request.suggested_date = SUGGESTED
+        request.suggested_time_slot_start = time(11, 30)
+    if appointment is not None:
+        request.appointment_id = appointment.appointment_id
+        request.appointment = appointment
+    request.doctor = User(id=DOCTOR_ID, first_name="Ada", last_name="Lee")
+    request.patient = User(id=PATIENT_ID, first_name="Sam", last_name="Roe")
+    return request
+
+
+def _appointment(reschedule_count=0):
+    return Appointment(
+        appointment_id=5,
+        appointment_date=PREFERRED,
+        status="scheduled",
+        reschedule_count=reschedule_count,
+    )
+
+
+class _Recorder:
+    """Stands in for the CRUD layer and records the writes each handler makes."""
+
+    def __init__(self, monkeypatch, request, *, update_result="updated"):
+        self.calls = []
+        self.request = request
+        self.update_result = update_result
+
+        async def get_request(session, request_id):
+            return request
+
+        async def update_request(session, request_id, **fields):
+            self.calls.append(("update_request", fields))
+            return None if self.update_result is None else SimpleNamespace(**fields)
+
+        def under_limit(fields):
+            # Mirrors the `reschedule_count < max_reschedule_count` guard in the UPDATE
+            limit = fields.get("max_reschedule_count")
+            return limit is None or request.appointment.reschedule_count < limit
+
+        async def atomic_accept(session, request_id, appointment_id, combined, **fields):
+            self.calls.append(("atomic_accept_reschedule", combined))
+            if self.update_result is None or not under_limit(fields):
+                return None
+            return SimpleNamespace(status="confirmed")
+
+        async def create_appointment(session, **fields):
+            self.calls.append(("create_appointment", fields))
+            return SimpleNamespace(appointment_id=99, **fields)
+
+        async def update_appointment(session, appointment_id, **fields):
+            self.calls.append(("update_appointment", fields))
+            if not under_limit(fields):
+                return None
+            return SimpleNamespace(appointment_id=appointment_id, **fields)
+
+        async def create_notification(session, **fields):
+            self.calls.append(("notification", fields))
+
+        async def invalidate(*args):
+            pass
+
+        crud = routes.appointment_request_crud
+        monkeypatch.setattr(crud, "get_appointment_request_with_parties", get_request)
+        monkeypatch.setattr(crud, "update_appointment_request", update_request)
+        monkeypatch.setattr(crud, "atomic_accept_reschedule", atomic_accept)
+        monkeypatch.setattr(routes.appointment_crud, "create_appointment", create_appointment)
+        monkeypatch.setattr(routes.appointment_crud, "update_appointment", update_appointment)
+        monkeypatch.setattr(routes.notification_crud, "create_notification", create_notification)
+        monkeypatch.setattr(routes, "_invalidate_request_lists", invalidate)
+        monkeypatch.setattr(routes, "_render", lambda adapter, data, *args: data)
+
+    def names(self):
+        return [name for name, _ in self.calls]
+
+    def notification(self):
+        return next(fields for name, fields in self.calls if name == "notification")
+
+
+DOCTOR = SimpleNamespace(id=DOCTOR_ID, role_str="doctor", is_patient=False)
+PATIENT = SimpleNamespace(id=PATIENT_ID, role_str=None, is_patient=True)
+
+
+def _patch(user, **update):
+    return asyncio.run(
+        routes.update_appointment_request(
+            1, AppointmentRequestUpdate(**update), current_user=user, session=None
+        )
+    )
+
+
+def test_doctor_accepts_initial_request(monkeypatch):
+    recorder = _Recorder(monkeypatch, _request(AppointmentRequestStatus.pending))
+
+    _patch(DOCTOR, status="accepted")
+
+    assert recorder.names() == ["create_appointment", "update_request", "notification"]
+    assert recorder.calls[1][1]["status"] == "confirmed"
+    assert recorder.calls[1][1]["appointment_id"] == 99
+    assert recorder.notification()["user_id"] == PATIENT_ID
+    assert recorder.notification()["type"] == "appointment_accepted"
+
+
+def test_doctor_accepts_reschedule_request(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch, _request(AppointmentRequestStatus.pending, appointment=_appointment())
+    )
+
+    _patch(DOCTOR, status="accepted")
+
+    assert recorder.names() == ["atomic_accept_reschedule", "notification"]
+    assert recorder.notification()["title"] == "Appointment Reschedule Confirmed"
+
+
+def test_doctor_accept_reschedule_that_changes_nothing_notifies_nobody(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch,
+        _request(AppointmentRequestStatus.pending, appointment=_appointment()),
+        update_result=None,
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        _patch(DOCTOR, status="accepted")
+
+    assert exc_info.value.status_code == 400
+    assert "notification" not in recorder.names()
+
+
+def test_doctor_accept_reschedule_past_the_limit_is_rejected(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch,
+        _request(
+            AppointmentRequestStatus.pending,
+            appointment=_appointment(reschedule_count=routes.MAX_RESCHEDULE_COUNT),
+        ),
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        _patch(DOCTOR, status="accepted")
+
+    assert exc_info.value.status_code == 400
+    assert "Maximum reschedule limit" in exc_info.value.detail
+    assert recorder.names() == ["atomic_accept_reschedule"]
+
+
+def test_doctor_rejects_initial_request(monkeypatch):
+    recorder = _Recorder(monkeypatch, _request(AppointmentRequestStatus.pending))
+
+    _patch(DOCTOR, status="rejected", notes="fully booked")
+
+    assert recorder.calls[0] == ("update_request", {"status": "rejected", "notes": "fully booked"})
+    assert recorder.notification()["type"] == "appointment_rejected"
+
+
+def test_doctor_rejects_reschedule_keeps_original_time(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch, _request(AppointmentRequestStatus.pending, appointment=_appointment())
+    )
+
+    _patch(DOCTOR, status="rejected")
+
+    fields = recorder.calls[0][1]
+    assert fields["status"] == "confirmed"
+    assert fields["preferred_date"] == PREFERRED
+
+
+def test_doctor_cannot_suggest_to_inflexible_initial_request(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch, _request(AppointmentRequestStatus.pending, is_flexible=False)
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        _patch(
+            DOCTOR,
+            status="doctor_suggested_alternative",
+            suggested_date=SUGGESTED,
+            suggested_time_slot_start=time(11, 30),
+        )
+
+    assert exc_info.value.status_code == 400
+    assert recorder.calls == []
+
+
+def test_doctor_suggests_alternative(monkeypatch):
+    recorder = _Recorder(monkeypatch, _request(AppointmentRequestStatus.pending))
+
+    _patch(
+        DOCTOR,
+        status="doctor_suggested_alternative",
+        suggested_date=SUGGESTED,
+        suggested_time_slot_start=time(11, 30),
+    )
+
+    assert recorder.calls[0][1]["status"] == "doctor_suggested_alternative"
+    assert recorder.notification()["type"] == "appointment_suggested"
+
+
+def test_patient_accepts_alternative_for_initial_request(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch,
+        _request(AppointmentRequestStatus.doctor_suggested_alternative, suggested=True),
+    )
+
+    _patch(PATIENT, status="patient_accepted_alternative")
+
+    assert recorder.names() == ["create_appointment", "update_request", "notification"]
+    assert recorder.calls[0][1]["appointment_date"] == datetime(
+        2025, 3, 5, 11, 30, tzinfo=timezone.utc
+    )
+    assert recorder.notification()["user_id"] == DOCTOR_ID
+
+
+def test_patient_accepts_alternative_for_reschedule(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch,
+        _request(
+            AppointmentRequestStatus.doctor_suggested_alternative,
+            appointment=_appointment(),
+            suggested=True,
+        ),
+    )
+
+    _patch(PATIENT, status="patient_accepted_alternative")
+
+    assert recorder.names() == ["update_appointment", "update_request", "notification"]
+    assert recorder.calls[0][1]["reschedule_count"] is routes.appointment_crud.INCREMENT
+
+
+def test_patient_accept_alternative_past_the_limit_is_rejected(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch,
+        _request(
+            AppointmentRequestStatus.doctor_suggested_alternative,
+            appointment=_appointment(reschedule_count=routes.MAX_RESCHEDULE_COUNT),
+            suggested=True,
+        ),
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        _patch(PATIENT, status="patient_accepted_alternative")
+
+    assert exc_info.value.status_code == 400
+    assert "Maximum reschedule limit" in exc_info.value.detail
+    assert recorder.names() == ["update_appointment"]
+
+
+def test_patient_accept_requires_a_doctor_suggestion(monkeypatch):
+    recorder = _Recorder(monkeypatch, _request(AppointmentRequestStatus.pending))
+
+    with pytest.raises(HTTPException) as exc_info:
+        _patch(PATIENT, status="patient_accepted_alternative")
+
+    assert exc_info.value.status_code == 400
+    assert recorder.calls == []
+
+
+def test_patient_rejects_alternative_for_initial_request_cancels_it(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch,
+        _request(AppointmentRequestStatus.doctor_suggested_alternative, suggested=True),
+    )
+
+    _patch(PATIENT, status="patient_rejected_alternative")
+
+    assert recorder.calls[0][1]["status"] == "cancelled"
+    assert recorder.notification()["type"] == "appointment_cancelled"
+
+
+def test_patient_requests_reschedule(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch, _request(AppointmentRequestStatus.confirmed, appointment=_appointment())
+    )
+
+    _patch(
+        PATIENT,
+        status="pending",
+        preferred_date=SUGGESTED,
+        preferred_time_slot_start=time(14, 0),
+    )
+
+    assert recorder.calls[0][1]["status"] == "pending"
+    assert recorder.notification()["user_id"] == DOCTOR_ID
+
+
+def test_patient_reschedule_limit(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch,
+        _request(
+            AppointmentRequestStatus.confirmed,
+            appointment=_appointment(reschedule_count=routes.MAX_RESCHEDULE_COUNT),
+        ),
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        _patch(
+            PATIENT,
+            status="pending",
+            preferred_date=SUGGESTED,
+            preferred_time_slot_start=time(14, 0),
+        )
+
+    assert exc_info.value.status_code == 400
+    assert recorder.calls == []
+
+
+def test_patient_cancels_confirmed_appointment(monkeypatch):
+    recorder = _Recorder(
+        monkeypatch, _request(AppointmentRequestStatus.confirmed, appointment=_appointment())
+    )
+
+    _patch(PATIENT, status="cancelled", notes="travelling")
+
+    assert recorder.names() == ["update_request", "notification", "update_appointment"]
+    assert recorder.calls[0][1]["notes"] == "Cancelled by patient. travelling"
+    assert recorder.calls[2][1]["status"] == "cancelled"
+
+
+def test_patient_cannot_set_other_statuses(monkeypatch):
+    recorder = _Recorder(monkeypatch, _request(AppointmentRequestStatus.pending))
+
+    with pytest.raises(HTTPException) as exc_info:
+        _patch(PATIENT, status="accepted")
+
+    assert exc_info.value.status_code == 400
+    assert recorder.calls == []
+
+
+def test_doctor_unknown_status_leaves_request_unchanged(monkeypatch):
+    request = _request(AppointmentRequestStatus.pending)
+    recorder = _Recorder(monkeypatch, request)
+
+    assert _patch(DOCTOR, status="confirmed") is request
+    assert recorder.calls == []
+
+
+def test_other_users_are_forbidden(monkeypatch):
+    _Recorder(monkeypatch, _request(AppointmentRequestStatus.pending))
+    stranger = SimpleNamespace(id=999, role_str="doctor", is_patient=True)
+
+    with pytest.raises(HTTPException) as exc_info:
+        _patch(stranger, status="accepted")
+
+    assert exc_info.value.status_code == 403
+
+
+def test_every_handler_entry_is_reachable_by_its_role():
+    for (role, requested_status, _), handler in routes._PATCH_HANDLERS.items():
+        assert role in ("doctor", "patient")
+        assert isinstance(requested_status, AppointmentRequestStatus)
+        assert handler.__name__.startswith(f"_{role}_")
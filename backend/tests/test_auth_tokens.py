@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from services import auth_utils
+
+
+def _payload(**overrides):
+    payload = {"sub": "42", "role": "doctor", "exp": int(time.time()) + 60}
+    payload.update(overrides)
+    return payload
+
+
+def test_hs256_round_trip():
+    payload = _payload()
+    token = auth_utils._encode_hs256(payload)
+
+    assert auth_utils._decode_hs256(token) == payload
+
+
+def test_hs256_tokens_are_standard_jwts():
+    payload = _payload()
+    token = auth_utils._encode_hs256(payload)
+
+    assert jwt.decode(token, auth_utils.SECRET_KEY, algorithms=["HS256"]) == payload
+    # and tokens minted by jose decode on the fast path
+    jose_token = jwt.encode(payload, auth_utils.SECRET_KEY, algorithm="HS256")
+    assert auth_utils._decode_hs256(jose_token) == payload
+
+
+def test_hs256_rejects_tampered_payload():
+    header, _, signature = auth_utils._encode_hs256(_payload()).split(".")
+    forged_body = auth_utils._b64url(b'{"sub":"1","role":"doctor","exp":9999999999}')
+    forged = f"{header}.{forged_body.decode()}.{signature}"
+
+    with pytest.raises(JWTError):
+        auth_utils._decode_hs256(forged)
+
+
+def test_hs256_rejects_foreign_key():
+    token = jwt.encode(_payload(), "some-other-secret", algorithm="HS256")
+
+    with pytest.raises(JWTError):
+        auth_utils._decode_hs256(token)
+
+
+@pytest.mark.parametrize("token", ["", "not-a-token", "a.b", "é.é.é"])
+def test_hs256_rejects_malformed_tokens(token):
+    with pytest.raises(JWTError):
+        auth_utils._decode_hs256(token)
+
+
+def test_hs256_rejects_expired_token():
+    token = auth_utils._encode_hs256(_payload(exp=int(time.time()) - 5))
+
+    with pytest.raises(JWTError):
+        auth_utils._decode_hs256(token)
+
+
+def test_create_tokens_carries_only_subject_role_and_expiry():
+    access_token, refresh_token, _ = asyncio.run(auth_utils.create_tokens(7, "patient"))
+
+    payload = asyncio.run(auth_utils.verify_access_token(access_token))
+    assert set(payload) == {"sub", "role", "exp"}
+    assert payload["sub"] == "7" and payload["role"] == "patient"
+    assert refresh_token and refresh_token != access_token
+
+
+def test_verify_access_token_caches_read_only_claims():
+    access_token, _, _ = asyncio.run(auth_utils.create_tokens(8, "doctor"))
+
+    first = asyncio.run(auth_utils.verify_access_token(access_token))
+    second = asyncio.run(auth_utils.verify_access_token(access_token))
+    assert first is second
+    assert access_token not in auth_utils._verified_tokens
+    with pytest.raises(TypeError):
+        first["role"] = "insurer"
+
+
+def test_verify_access_token_rejects_bad_signature_with_401():
+    token = jwt.encode(_payload(), "some-other-secret", algorithm="HS256")
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(auth_utils.verify_access_token(token))
+    assert exc_info.value.status_code == 401
@@ -0,0 +1,41 @@
+import pytest
+
+from routers.auth_routes import _LOGIN_ACTIONS, _login_action
+
+
+@pytest.mark.parametrize(
+    "selected_role, is_patient, role_value, expected",
+    [
+        # Selected patient: patients log straight in, provider-only accounts are prompted
+        ("patient", True, None, "login_patient"),
+        ("patient", True, "doctor", "login_patient"),
+        ("patient", False, "doctor", "prompt_service_provider_to_patient"),
+        ("patient", False, "pharmacist", "prompt_service_provider_to_patient"),
+        # Selected the account's own provider role
+        ("doctor", False, "doctor", "login_selected_role"),
+        ("doctor", True, "doctor", "login_selected_role"),
+        ("insurer", False, "insurer", "login_selected_role"),
+        # Selected a provider role the account doesn't hold
+        ("doctor", False, "pharmacist", "role_conflict"),
+        ("insurer", True, "doctor", "role_conflict"),
+        # Patient-only account selecting a provider role is offered to add it
+        ("doctor", True, None, "prompt_patient_to_service_provider"),
+        ("pharmacist", True, None, "prompt_patient_to_service_provider"),
+        # Neither patient nor provider: honour the selection
+        ("doctor", False, None, "login_selected_role"),
+        # No or unknown role selected falls back to the default login
+        (None, True, None, "login_default"),
+        (None, False, "doctor", "login_default"),
+        ("admin", True, "doctor", "login_default"),
+    ],
+)
+def test_login_action(selected_role, is_patient, role_value, expected):
+    assert _login_action(selected_role, is_patient, role_value) == expected
+
+
+def test_every_selected_kind_is_fully_covered():
+    # each (kind, is_patient, match) combination for a selected role has an entry
+    for kind in ("patient", "provider"):
+        for is_patient in (True, False):
+            for match in ("none", "same", "other"):
+                assert (kind, is_patient, match) in _LOGIN_ACTIONS
@@ -0,0 +1,59 @@
+import asyncio
+
+import bcrypt
+from argon2 import PasswordHasher
+
+from services import auth_utils
+
+
+def _legacy_bcrypt_hash(password: str) -> str:
+    prehashed = auth_utils._bcrypt_prehash(password)
+    return bcrypt.hashpw(prehashed.encode("utf-8"), bcrypt.gensalt(rounds=4)).decode()
+
+
+def test_hash_password_produces_argon2id():
+    hashed = asyncio.run(auth_utils.hash_password("correct horse"))
+
+    assert hashed.startswith("$argon2id$")
+    assert not auth_utils.password_needs_rehash(hashed)
+
+
+def test_verify_password_argon2():
+    hashed = asyncio.run(auth_utils.hash_password("correct horse"))
+
+    assert asyncio.run(auth_utils.verify_password("correct horse", hashed))
+    assert not asyncio.run(auth_utils.verify_password("wrong horse", hashed))
+
+
+def test_verify_password_legacy_bcrypt():
+    hashed = _legacy_bcrypt_hash("correct horse")
+
+    assert asyncio.run(auth_utils.verify_password("correct horse", hashed))
+    assert not asyncio.run(auth_utils.verify_password("wrong horse", hashed))
+    assert auth_utils.password_needs_rehash(hashed)
+
+
+def test_verify_password_legacy_bcrypt_long_password():
+    # bcrypt only sees 72 bytes; longer passwords were SHA-256 pre-hashed
+    password = "p" * 100
+    hashed = _legacy_bcrypt_hash(password)
+
+    assert asyncio.run(auth_utils.verify_password(password, hashed))
+    assert not asyncio.run(auth_utils.verify_password("p" * 99, hashed))
+
+
+def test_verify_password_unknown_account_is_false():
+    assert not asyncio.run(auth_utils.verify_password("anything", None))
+
+
+def test_verify_password_malformed_hashes_are_false():
+    assert not asyncio.run(auth_utils.verify_password("anything", "not-a-hash"))
+    assert not asyncio.run(auth_utils.verify_password("anything", "$argon2id$garbage"))
+
+
+def test_outdated_argon2_parameters_need_rehash():
+    weaker = PasswordHasher(time_cost=1, memory_cost=8 * 1024, parallelism=1)
+    hashed = weaker.hash("correct horse")
+
+    assert asyncio.run(auth_utils.verify_password("correct horse", hashed))
+    assert auth_utils.password_needs_rehash(hashed)